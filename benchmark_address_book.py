@@ -0,0 +1,728 @@
+import asyncio
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+FIRST_NAMES = ["Anna", "Jan", "Piotr", "Katarzyna", "Tomasz", "Agnieszka", "Paweł", "Małgorzata", "Michał", "Ewa"]
+LAST_NAMES = ["Kowalski", "Nowak", "Wiśniewski", "Wójcik", "Kamińska", "Lewandowski", "Zielińska", "Szymański", "Dąbrowski", "Kozłowska"]
+CITIES = ["Warszawa", "Kraków", "Łódź", "Wrocław", "Poznań", "Gdańsk", "Szczecin", "Lublin"]
+
+
+def load_assistant():
+    """Imports homework2.1.py, whose file name is not a valid module name."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "homework2.1.py")
+    spec = importlib.util.spec_from_file_location("homework2_1", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+assistant = load_assistant()
+
+
+def synthetic_record(i, rng):
+    """Builds a random but valid record with a unique name."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+    record = assistant.Record(assistant.Name(name))
+    record.add_phone(assistant.Phone(f"{rng.randrange(10**9):09d}"))
+    record.add_email(assistant.Email(f"user{i}@example.com"))
+    record.birthday = assistant.Birthday(
+        f"{rng.randint(1950, 2010)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    )
+    record.address = assistant.Address(
+        f"ul. Polna {rng.randint(1, 200)}",
+        rng.choice(CITIES),
+        f"{rng.randint(0, 99):02d}-{rng.randint(0, 999):03d}",
+        "Polska",
+    )
+    return record
+
+
+def build_book(size, seed=0):
+    """Fills an address book with synthetic records without printing.
+
+    The query cache is disabled, so benchmarks measure the queries themselves.
+    """
+    rng = random.Random(seed)
+    book = assistant.AddressBook()
+    book.query_cache.max_size = 0
+    for i in range(size):
+        record = synthetic_record(i, rng)
+        book[record.name.value] = record
+    return book
+
+
+def timed(func, repeat):
+    """Returns the average time of one call in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_find(sizes):
+    """Compares the linear scan with the n-gram index of find_record."""
+    terms = ["Kowalski 12", "nowak", "user42@", "500", "Zi"]
+    for size in sizes:
+        start = time.perf_counter()
+        book = build_book(size)
+        print(f"{size} kontaktów, budowa: {time.perf_counter() - start:.2f} s")
+        for term in terms:
+            scan = timed(lambda: [r for r in book.data.values() if r.matches(term)], 3)
+            indexed = timed(lambda: book.find_record(term), 3)
+            print(f"  {term!r:16} skan: {scan:9.2f} ms  indeks: {indexed:9.2f} ms")
+
+
+def days_to_birthday_reparsed(record, today):
+    """Days to the next birthday computed the old way, parsing the text each time."""
+    bday = datetime.strptime(record.birthday.value, "%Y-%m-%d").date()
+    return (assistant.next_birthday(bday, today) - today).days
+
+
+def bench_birthday(sizes):
+    """Compares per-record cost of re-parsing the birthday with the parsed date."""
+    today = datetime.now().date()
+    for size in sizes:
+        records = list(build_book(size).data.values())
+        reparsed = timed(lambda: [days_to_birthday_reparsed(r, today) for r in records], 3)
+        parsed = timed(lambda: [r.days_to_birthday() for r in records], 3)
+        print(
+            f"{size} kontaktów, na wpis: strptime {reparsed / size * 1000:.2f} µs,"
+            f" sparsowana data {parsed / size * 1000:.2f} µs"
+        )
+
+
+def payload_size(record):
+    """Returns the number of characters of text stored in a record."""
+    address = record.address
+    return (
+        len(record.name.value)
+        + sum(len(phone.value) for phone in record.phones)
+        + sum(len(email.value) for email in record.emails)
+        + len(record.birthday.value)
+        + len(address.street) + len(address.city) + len(address.postal_code) + len(address.country)
+    )
+
+
+def bench_memory(sizes):
+    """Measures memory of the records and of the indexed book with tracemalloc."""
+    for size in sizes:
+        rng = random.Random(0)
+        tracemalloc.start()
+        records = [synthetic_record(i, rng) for i in range(size)]
+        records_bytes = tracemalloc.get_traced_memory()[0]
+        book = assistant.AddressBook()
+        for record in records:
+            book[record.name.value] = record
+        book_bytes = tracemalloc.get_traced_memory()[0] - records_bytes
+        tracemalloc.stop()
+        payload = sum(payload_size(record) for record in records)
+        print(
+            f"{size} kontaktów: dane {payload / size:.0f} B/wpis,"
+            f" obiekty {records_bytes / size:.0f} B/wpis,"
+            f" słownik i indeksy {book_bytes / size:.0f} B/wpis"
+        )
+        del book, records
+
+
+def bench_save(sizes):
+    """Compares saving one edit through the journal with pickling the whole book."""
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            filename = os.path.join(folder, f"book_{size}.pkl")
+            book = build_book(size)
+            book.journal = assistant.Journal(filename)
+            full = timed(lambda: book.journal.compact(book.data), 1)
+            records = list(book.data.values())
+
+            def edit_and_sync():
+                record = random.choice(records)
+                record.edit_phone(record.phones[0], assistant.Phone(f"{random.randrange(10**9):09d}"))
+                book.journal.sync()
+
+            journaled = timed(edit_and_sync, 100)
+            book.journal.close()
+            print(f"{size} kontaktów: cały pickle {full:.1f} ms, wpis w dzienniku {journaled:.3f} ms")
+
+
+def bench_startup(sizes):
+    """Compares opening a pickled book with opening the memory-mapped book file."""
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            book = build_book(size)
+            pickled = os.path.join(folder, f"book_{size}.pkl")
+            mapped = os.path.join(folder, f"book_{size}.book")
+            with open(pickled, "wb") as file:
+                pickle.dump(book.data, file)
+            assistant.write_book_file(mapped, book.data)
+            name = random.choice(list(book.data))
+            del book
+
+            def open_pickled():
+                with open(pickled, "rb") as file:
+                    return assistant.AddressBook(pickle.load(file))
+
+            def open_mapped():
+                journal = assistant.Journal(mapped)
+                opened = assistant.AddressBook.lazy(journal.load())
+                journal.close()
+                return opened
+
+            mapped_ms = timed(lambda: open_mapped()[name], 1)
+            pickle_ms = timed(lambda: open_pickled()[name], 1)
+            print(f"{size} kontaktów, start i jeden odczyt: pickle {pickle_ms:.1f} ms, mmap {mapped_ms:.2f} ms")
+
+
+def bench_import(sizes):
+    """Reports export and import throughput for every contact file format."""
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            book = build_book(size)
+            for extension in ("csv", "jsonl", "vcf"):
+                filename = os.path.join(folder, f"contacts_{size}.{extension}")
+                exported, export_seconds = assistant.export_contacts(book, filename)
+                imported, rejected, import_seconds = assistant.import_contacts(
+                    assistant.AddressBook(), filename
+                )
+                print(
+                    f"{size} kontaktów, {extension:5}: eksport {exported / export_seconds:,.0f}/s,"
+                    f" import {imported / import_seconds:,.0f}/s, odrzucone {rejected}"
+                )
+
+
+def validate_one_by_one(phones, emails, dates):
+    """Validates values the old way: a fresh re.compile and strptime per value."""
+    for phone in phones:
+        re.compile(r"^\d{9}$").match(phone)
+    for email in emails:
+        re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$").match(email)
+    for value in dates:
+        try:
+            datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            pass
+
+
+def bench_validate(sizes):
+    """Compares per-value validation with the batch validation functions."""
+    rng = random.Random(0)
+    for size in sizes:
+        phones = [f"{rng.randrange(10**9):09d}" for _ in range(size)]
+        emails = [f"user{i}@example.com" for i in range(size)]
+        dates = [f"{rng.randint(1950, 2010)}-{rng.randint(1, 12):02d}-{rng.randint(1, 31):02d}" for _ in range(size)]
+
+        def validate_batch():
+            assistant.validate_phones(phones)
+            assistant.validate_emails(emails)
+            assistant.validate_birthdays(dates)
+
+        old = timed(lambda: validate_one_by_one(phones, emails, dates), 1)
+        batch = timed(validate_batch, 1)
+        print(f"{size} x (telefon, email, data): pojedynczo {old:.0f} ms, wsadowo {batch:.0f} ms")
+
+
+def walk_by_slicing(book, page_size):
+    """Walks the book the old way, slicing a fresh list of all records per page."""
+    start = 0
+    while start < len(book.data):
+        list(book.data.values())[start : start + page_size]
+        start += page_size
+
+
+def bench_pages(sizes):
+    """Compares walking the whole book page by page: list slicing vs cursors."""
+    for size in sizes:
+        book = build_book(size)
+        cursor_ms = timed(lambda: sum(1 for _ in book.pages(page_size=5)), 1)
+        if size <= 100_000:
+            slicing = f"{timed(lambda: walk_by_slicing(book, 5), 1):.0f} ms"
+        else:
+            slicing = "pominięte (O(N²))"
+        print(f"{size} kontaktów po 5: wycinanie listy {slicing}, kursor {cursor_ms:.0f} ms")
+
+
+def fuzzy_scan(book, query, max_distance=2):
+    """Finds names close to the query by computing the distance to every name."""
+    query_words = assistant.normalize_name(query).split()
+    found = []
+    for record in book.data.values():
+        words = assistant.normalize_name(record.name.value).split()
+        distances = [
+            min(assistant.edit_distance(query_word, word, max_distance) for word in words)
+            for query_word in query_words
+        ]
+        if max(distances) <= max_distance:
+            found.append((sum(distances), record))
+    return sorted(found, key=lambda item: item[0])[:10]
+
+
+def bench_fuzzy(sizes):
+    """Compares a full edit-distance scan with the deletion-dictionary index."""
+    queries = ["Kowalsky", "Malgorzta Wisniewski", "nowk"]
+    for size in sizes:
+        book = build_book(size)
+        for query in queries:
+            indexed = timed(lambda: book.find_fuzzy(query), 3)
+            if size <= 100_000:
+                scan = f"{timed(lambda: fuzzy_scan(book, query), 1):9.1f} ms"
+            else:
+                scan = "pominięty"
+            print(f"{size} kontaktów, {query!r:24} skan: {scan}  indeks: {indexed:7.2f} ms")
+
+
+def bench_cache(sizes):
+    """Replays a skewed stream of repeated queries with and without the cache."""
+    rng = random.Random(1)
+    popular = ["Kowalski", "nowak", "500", "user1", "Zieli", "Anna", "Ewa", "123"]
+    rare = [f"user{i}@" for i in range(200)]
+    queries = [rng.choice(popular) if rng.random() < 0.8 else rng.choice(rare) for _ in range(2000)]
+    for size in sizes:
+        book = build_book(size)
+        uncached = timed(lambda: [book.find_record(query) for query in queries], 1)
+        book.query_cache = assistant.QueryCache(max_size=64)
+        cached = timed(lambda: [book.find_record(query) for query in queries], 1)
+        record = next(iter(book.data.values()))
+        record.edit_phone(record.phones[0], assistant.Phone("123123123"))
+        after_edit = timed(lambda: [book.find_record(query) for query in queries], 1)
+        print(
+            f"{size} kontaktów, {len(queries)} zapytań: bez pamięci podręcznej {uncached:.0f} ms,"
+            f" z nią {cached:.0f} ms, po edycji {after_edit:.0f} ms, {book.query_cache.stats()}"
+        )
+
+
+def index_state(index):
+    """Returns the attributes of an index, ignoring empty posting entries.
+
+    A phone index is compared by its (number, key) pairs, since record slots
+    depend on the order of the changes.
+    """
+    if isinstance(index, assistant.PhoneIndex):
+        return sorted(index.items())
+    return {
+        name: {key: keys for key, keys in value.items() if keys}
+        if isinstance(value, dict)
+        else value
+        for name, value in vars(index).items()
+    }
+
+
+def phone_scan(book, number):
+    """Finds the owners of a number the old way, scanning every phone list."""
+    return [
+        record
+        for record in book.data.values()
+        if any(phone.value == number for phone in record.phones)
+    ]
+
+
+def bench_phone(sizes):
+    """Compares reverse phone lookup by scanning with the packed phone index."""
+    rng = random.Random(2)
+    for size in sizes:
+        book = build_book(size)
+        records = list(book.data.values())
+        numbers = [rng.choice(records).phones[0].value for _ in range(100)]
+        dashed = [f"{n[:3]}-{n[3:6]}-{n[6:]}" for n in numbers]
+        scan = timed(lambda: phone_scan(book, numbers[0]), 3)
+        exact = timed(lambda: [book.find_by_phone(number) for number in dashed], 10) / 100
+        prefix = timed(lambda: list(book.find_by_phone_prefix(numbers[0][:5])), 100)
+        index = book._phone_index
+        packed = sum(block.itemsize * len(block) for block in index.blocks)
+        phones = sum(len(block) for block in index.blocks)
+        print(
+            f"{size} kontaktów: skan {scan:.2f} ms, numer {exact * 1000:.1f} µs,"
+            f" prefiks 5 cyfr {prefix * 1000:.1f} µs,"
+            f" {packed / phones:.0f} B na numer w tablicach"
+        )
+
+
+def synthetic_notes(count, seed=0):
+    """Yields (content, tags) of random notes over a vocabulary of 5000 words."""
+    rng = random.Random(seed)
+    vocabulary = [f"słowo{i}" for i in range(5000)]
+    tags = [f"tag{i}" for i in range(50)]
+    for _ in range(count):
+        content = " ".join(rng.choices(vocabulary, k=rng.randint(8, 15)))
+        yield content, rng.sample(tags, rng.randint(1, 3))
+
+
+def bench_notes(sizes):
+    """Measures the notebook: indexing, searches vs scans, and persistence."""
+    for size in sizes:
+        notebook = assistant.Notebook()
+        start = time.perf_counter()
+        for content, tags in synthetic_notes(size):
+            notebook.add_note(content, tags)
+        added = time.perf_counter() - start
+        print(f"{size} notatek: dodawanie z indeksowaniem {size / added:.0f}/s")
+
+        query = "słowo17 słowo42"
+        words = assistant.note_words(query)
+        scan = timed(
+            lambda: [
+                note
+                for note in notebook.notes.values()
+                if words <= assistant.note_words(note.content)
+            ],
+            1,
+        )
+        indexed = timed(lambda: notebook.search_notes(query), 10)
+        tag_scan = timed(
+            lambda: [note for note in notebook.notes.values() if "tag7" in note.tags], 1
+        )
+        tag_indexed = timed(lambda: notebook.search_tag("tag7"), 10)
+        sort_tags = timed(notebook.sort_tags, 1)
+        print(
+            f"  tekst: skan {scan:.0f} ms, indeks {indexed:.2f} ms;"
+            f" tag: skan {tag_scan:.0f} ms, indeks {tag_indexed:.1f} ms;"
+            f" sort_tags {sort_tags:.0f} ms"
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "notes.pkl")
+            snapshot = timed(lambda: notebook.save_notes(filename), 1)
+            incremental = timed(lambda: notebook.add_note("nowa notatka", ["tag1"]), 1000)
+            notebook.journal.close()
+            loaded = assistant.Notebook()
+            load = timed(lambda: loaded.load_notes(filename), 1)
+            loaded.journal.close()
+            print(
+                f"  zapis całości {snapshot:.0f} ms, zmiana w dzienniku"
+                f" {incremental * 1000:.0f} µs, wczytanie {load:.0f} ms"
+            )
+
+
+def print_one_by_one(book, output):
+    """Lists the book the old way: one print and one Record.__str__ per record."""
+    for i, (name, record) in enumerate(book.data.items(), start=1):
+        print(f"{i}. {name}: {record}", file=output)
+
+
+def bench_render(sizes):
+    """Compares listing the book with print per record and the batched renderer."""
+    for size in sizes:
+        book = build_book(size)
+        with open(os.devnull, "w", encoding="utf-8") as output:
+            old = timed(lambda: print_one_by_one(book, output), 1)
+            rendered = {
+                fmt: timed(lambda: book.show_all_records(fmt, output=output), 1)
+                for fmt in assistant.RENDER_FORMATS
+            }
+        formats = ", ".join(f"{fmt} {ms:.0f} ms" for fmt, ms in rendered.items())
+        print(f"{size} kontaktów: print po jednym {old:.0f} ms, renderer: {formats}")
+
+
+def bench_cli(sizes, runs=10, batch=1000):
+    """Times CLI invocations on a saved book: one process per operation vs batch."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "homework2.1.py")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "book.pkl")
+            assistant.write_book_file(filename, build_book(size).data)
+
+            def assistant_cli(*args, stdin=None):
+                subprocess.run(
+                    [sys.executable, script, "--file", filename, *args],
+                    input=stdin,
+                    text=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+
+            times = {}
+            for label, args in {
+                "add": ("add", "Nowy Kontakt", "--phone", "123456789"),
+                "delete": ("delete", "Nowy Kontakt"),
+                "find": ("find", "user1@"),
+                "birthdays": ("birthdays", "7", "--limit", "10"),
+            }.items():
+                times[label] = timed(lambda: assistant_cli(*args), runs)
+            lines = "".join(f"add 'Wsadowy {i}' --phone {i:09d}\n" for i in range(batch))
+            start = time.perf_counter()
+            assistant_cli("batch", stdin=lines)
+            per_second = batch / (time.perf_counter() - start)
+            singles = ", ".join(f"{label} {ms:.0f} ms" for label, ms in times.items())
+            print(f"{size} kontaktów: pojedyncze wywołania {singles}; wsadowo {per_second:.0f} add/s")
+
+
+def check_consistency(book):
+    """Rebuilds every index from the records and compares it with the live one.
+
+    Returns a list of problems; an empty list means the book is consistent.
+    """
+    problems = []
+    for key, record in book.data.items():
+        if record.name.value != key:
+            problems.append(f"klucz {key!r} wskazuje na {record.name.value!r}")
+        if record.book is not book:
+            problems.append(f"wpis {key!r} nie należy do książki")
+    if sorted(book._order.numbers_by_key, key=book._order.__getitem__) != list(book.data):
+        problems.append("kolejność wpisów nie zgadza się z danymi")
+    fresh = [
+        assistant.NgramIndex(),
+        assistant.BirthdayIndex(),
+        assistant.FuzzyIndex(),
+        assistant.PhoneIndex(),
+    ]
+    for key, record in book.data.items():
+        for index in fresh:
+            index.add(key, record)
+    for live, rebuilt in zip(book._indexes, fresh):
+        if index_state(live) != index_state(rebuilt):
+            problems.append(f"{type(live).__name__} różni się od przebudowanego")
+    for query in ["Kowalski", "500", "user1", "Ewa"]:
+        scan = [record for record in book.data.values() if record.matches(query)]
+        if book._find_record(query) != scan:
+            problems.append(f"wyszukiwanie {query!r} różni się od skanu")
+    return problems
+
+
+def bench_concurrent(sizes, readers=4, writers=2, seconds=2.0):
+    """Runs reader and writer threads on one ConcurrentAddressBook.
+
+    Readers check that every result matches its query; afterwards the indexes
+    are compared with ones rebuilt from scratch.
+    """
+    for size in sizes:
+        rng = random.Random(0)
+        book = assistant.ConcurrentAddressBook()
+        book.add_records(synthetic_record(i, rng) for i in range(size))
+        keys = list(book.data)
+        stop = threading.Event()
+        counts = [0] * (readers + writers)
+        errors = []
+
+        def reader(slot):
+            rng = random.Random(slot)
+            today = datetime.now().date()
+            while not stop.is_set():
+                query = rng.choice(["Kowalski", "nowak", str(rng.randrange(1000)), "Ewa"])
+                # Check under the same shared lock, before a writer edits the results.
+                with book.lock.reading():
+                    found = book.find_record(query)
+                    if not all(record.matches(query) for record in found):
+                        errors.append(f"wynik nie pasuje do {query!r}")
+                    for day, record in book.birthdays_between(today, today):
+                        if record.birthday is None or record.birthday.date.day != day.day:
+                            errors.append("zła data urodzin")
+                page = next(book.pages(page_size=20, cursor=rng.randrange(size)), [])
+                if len(page) > 20:
+                    errors.append("za długa strona")
+                counts[slot] += 3
+
+        def writer(slot):
+            rng = random.Random(slot)
+            next_id = size + slot * 10_000_000
+            while not stop.is_set():
+                choice = rng.random()
+                if choice < 0.4:
+                    record = synthetic_record(next_id, rng)
+                    next_id += 1
+                    book[record.name.value] = record
+                elif choice < 0.7:
+                    try:
+                        del book[rng.choice(keys)]
+                    except KeyError:
+                        pass
+                else:
+                    try:
+                        record = book.data[rng.choice(keys)]
+                        record.edit_phone(
+                            record.phones[0], assistant.Phone(f"{rng.randrange(10**9):09d}")
+                        )
+                    except (KeyError, ValueError, IndexError):
+                        pass
+                counts[slot] += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [
+            threading.Thread(target=writer, args=(readers + i,)) for i in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        problems = errors[:5] + check_consistency(book)
+        print(
+            f"{size} kontaktów, {readers} czytających, {writers} piszących:"
+            f" odczyty {sum(counts[:readers]) / seconds:.0f}/s,"
+            f" zapisy {sum(counts[readers:]) / seconds:.0f}/s,"
+            f" {'spójna' if not problems else 'BŁĘDY: ' + '; '.join(problems)}"
+        )
+
+
+def run_server(size, filename, ports):
+    """Serves a synthetic book on a free localhost port, reported through `ports`."""
+    book = build_book(size)
+    service = assistant.AddressBookService(book, filename)
+    ready = lambda server: ports.put(server.sockets[0].getsockname()[1])
+    asyncio.run(service.serve(port=0, ready=ready))
+
+
+def synthetic_request(rng, size, request_id):
+    """Returns a mixed request: mostly searches, some writes and birthday queries."""
+    choice = rng.random()
+    if choice < 0.8:
+        op, args = "find", {"query": f"user{rng.randrange(size)}@"}
+    elif choice < 0.9:
+        name = f"Klient {request_id}"
+        op, args = "add", {"name": name, "phones": [f"{rng.randrange(10**9):09d}"]}
+    elif choice < 0.95:
+        op, args = "delete", {"name": f"Klient {request_id - 5}"}
+    else:
+        op, args = "birthdays", {"days": 7}
+    line = json.dumps({"id": request_id, "op": op, "args": args}) + "\n"
+    return line.encode()
+
+
+async def load_client(port, size, requests, depth, seed, latencies):
+    """Sends requests keeping up to `depth` of them in flight, recording latencies."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2**24)
+    sent_at = {}
+    in_flight = asyncio.Semaphore(depth)
+
+    async def send():
+        for i in range(requests):
+            await in_flight.acquire()
+            request_id = seed * requests + i
+            sent_at[request_id] = time.perf_counter()
+            writer.write(synthetic_request(rng, size, request_id))
+            await writer.drain()
+
+    sending = asyncio.create_task(send())
+    for _ in range(requests):
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent_at.pop(response["id"]))
+        in_flight.release()
+    await sending
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(port, size, clients, requests, depth):
+    """Runs the clients at once; returns latencies in seconds and the wall time."""
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(load_client(port, size, requests, depth, seed, latencies) for seed in range(clients))
+    )
+    return latencies, time.perf_counter() - start
+
+
+def bench_server(sizes, clients=16, requests=2_000, depth=8):
+    """Load-tests the JSON-lines service in a separate process over localhost TCP."""
+    context = multiprocessing.get_context("fork")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            ports = context.Queue()
+            server = context.Process(
+                target=run_server, args=(size, os.path.join(directory, "book.pkl"), ports)
+            )
+            server.start()
+            try:
+                port = ports.get(timeout=600)
+                for pipeline in (1, depth):
+                    latencies, seconds = asyncio.run(
+                        load_test(port, size, clients, requests, pipeline)
+                    )
+                    latencies.sort()
+                    p50 = latencies[len(latencies) // 2] * 1000
+                    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+                    print(
+                        f"{size} kontaktów, {clients} klientów, potok {pipeline}:"
+                        f" {len(latencies) / seconds:.0f} zapytań/s,"
+                        f" p50 {p50:.2f} ms, p99 {p99:.2f} ms"
+                    )
+            finally:
+                server.terminate()
+                server.join()
+
+
+def bench_sharded(sizes, max_shards=None):
+    """Times fan-out queries over 1, 2, 4, ... shards and the scaling efficiency.
+
+    Fuzzy search is CPU-bound and returns few records; the birthdays of three
+    days return about 1% of the book and show the cost of merging results.
+    """
+    max_shards = max_shards or os.cpu_count()
+    shard_counts = [1]
+    while shard_counts[-1] * 2 <= max_shards:
+        shard_counts.append(shard_counts[-1] * 2)
+    if shard_counts[-1] != max_shards:
+        shard_counts.append(max_shards)
+    # Every call uses a new name, so the query caches of the shards never hit.
+    names = itertools.cycle(
+        [f"{first[:-1]} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    )
+    first_day = datetime(2024, 1, 1).date()
+    days = itertools.cycle([first_day + timedelta(days=i) for i in range(366)])
+    queries = {
+        "fuzzy": lambda book: book.find_fuzzy(next(names)),
+        "urodziny": lambda book: book.birthdays_between(
+            day := next(days), day + timedelta(days=2)
+        ),
+    }
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "book.pkl")
+            assistant.write_book_file(filename, build_book(size).data)
+            baseline = {}
+            for shards in shard_counts:
+                with assistant.ShardedAddressBook(filename, shards) as book:
+                    for label, query in queries.items():
+                        ms = timed(lambda: query(book), 5)
+                        baseline.setdefault(label, ms)
+                        speedup = baseline[label] / ms
+                        print(
+                            f"{size} kontaktów, {shards} procesów, {label}: {ms:8.1f} ms,"
+                            f" przyspieszenie {speedup:.2f}x, wydajność {speedup / shards:.0%}"
+                        )
+
+
+BENCHMARKS = {
+    "find": bench_find,
+    "birthday": bench_birthday,
+    "memory": bench_memory,
+    "save": bench_save,
+    "startup": bench_startup,
+    "import": bench_import,
+    "validate": bench_validate,
+    "pages": bench_pages,
+    "fuzzy": bench_fuzzy,
+    "cache": bench_cache,
+    "concurrent": bench_concurrent,
+    "server": bench_server,
+    "sharded": bench_sharded,
+    "phone": bench_phone,
+    "notes": bench_notes,
+    "render": bench_render,
+    "cli": bench_cli,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmark_address_book.py {'|'.join(BENCHMARKS)} [size ...]")
+        sys.exit(1)
+    sizes = [int(size) for size in sys.argv[2:]] or [10_000, 100_000, 1_000_000]
+    BENCHMARKS[sys.argv[1]](sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import random
+import subprocess
+import sys
+import time
+
+
+def synthetic_session(count, seed=0):
+    """Returns `count` command lines mixing adds, changes and lookups.
+
+    `show all` is left out: its O(N) output would dominate both runs.
+    """
+    rng = random.Random(seed)
+    lines = ["hello"]
+    for i in range(count - 1):
+        name = f"user{rng.randrange(max(i, 1))}"
+        choice = rng.random()
+        if choice < 0.4:
+            lines.append(f"add user{i} {rng.randrange(10**9):09d}")
+        elif choice < 0.6:
+            lines.append(f"change {name} {rng.randrange(10**9):09d}")
+        else:
+            lines.append(f"phone {name}")
+    return lines
+
+
+def legacy_loop(contacts):
+    """The bot loop before the command engine: startswith checks and a global dict."""
+    while True:
+        user_input = input("Your command: ").lower()
+
+        if user_input in ["good bye", "close", "exit"]:
+            print("Good bye!")
+            break
+        elif user_input == "hello":
+            print("How can I help you?")
+        elif user_input.startswith("add"):
+            _, name, phone = user_input.split()
+            contacts[name] = phone
+            print(f"Added contact: {name}, {phone}")
+        elif user_input.startswith("change"):
+            _, name, phone = user_input.split()
+            contacts[name] = phone
+            print(f"Changed phone for contact {name} to {phone}")
+        elif user_input.startswith("phone"):
+            _, name = user_input.split()
+            try:
+                print(f"Phone for contact {name}: {contacts[name]}")
+            except KeyError as e:
+                print(str(e))
+        elif user_input == "show all":
+            print("\n".join([f"{name}: {phone}" for name, phone in contacts.items()]))
+        else:
+            print("Invalid command. Type 'hello' to start.")
+
+
+def run_replay(command, lines):
+    """Pipes the session into a fresh process; returns commands per second."""
+    script = "\n".join(lines + ["exit"]) + "\n"
+    start = time.perf_counter()
+    subprocess.run(command, input=script, text=True, stdout=subprocess.DEVNULL, check=True)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main():
+    if sys.argv[1:] == ["--legacy"]:
+        legacy_loop({})
+        return
+    counts = [int(count) for count in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    here = os.path.dirname(os.path.abspath(__file__))
+    commands = {
+        "dotychczasowa pętla": [sys.executable, os.path.join(here, "benchmark_bot.py"), "--legacy"],
+        "silnik wsadowy": [sys.executable, os.path.join(here, "homework9.py"), "-"],
+    }
+    for count in counts:
+        lines = synthetic_session(count)
+        for label, command in commands.items():
+            print(f"{count} poleceń, {label}: {run_replay(command, lines):.0f} poleceń/s")
+
+
+if __name__ == "__main__":
+    main()
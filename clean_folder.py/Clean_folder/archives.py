@@ -0,0 +1,201 @@
+
+import gzip
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 1 << 20
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar', '.zip', '.gz')
+
+
+def archive_stem(name):
+    """Returns the archive name without its archive extension: 'a.tar.gz' -> 'a'."""
+    lower = name.lower()
+    for suffix in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)]
+    return os.path.splitext(name)[0] or name
+
+
+def safe_path(folder, member_name):
+    """Joins a member name to the extraction folder, refusing names that leave it."""
+    path = os.path.normpath(os.path.join(folder, member_name))
+    if os.path.isabs(member_name) or os.path.commonpath([folder, path]) != folder:
+        raise ValueError(f"unsafe path in archive: {member_name}")
+    return path
+
+
+def copy_stream(source, path):
+    """Writes a file-like object to `path` in chunks and returns the number of bytes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'wb') as target:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return written
+            target.write(chunk)
+            written += len(chunk)
+
+
+def extract_zip(archive_path, folder):
+    files = written = 0
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            path = safe_path(folder, info.filename)
+            if info.is_dir():
+                os.makedirs(path, exist_ok=True)
+                continue
+            with archive.open(info) as source:
+                written += copy_stream(source, path)
+            files += 1
+    return files, written
+
+
+def extract_tar(archive_path, folder):
+    files = written = 0
+    # Stream mode reads the (compressed) tar once, front to back.
+    with tarfile.open(archive_path, 'r|*') as archive:
+        for member in archive:
+            path = safe_path(folder, member.name)
+            if member.isdir():
+                os.makedirs(path, exist_ok=True)
+            elif member.isfile():
+                written += copy_stream(archive.extractfile(member), path)
+                files += 1
+            # Links and device files are skipped: they could point outside the folder.
+    return files, written
+
+
+def extract_gzip(archive_path, folder):
+    name = archive_stem(os.path.basename(archive_path))
+    with gzip.open(archive_path) as source:
+        return 1, copy_stream(source, safe_path(folder, name))
+
+
+def extract_archive(archive_path, folder):
+    """Extracts one archive into `folder` and returns (archive, folder, files, bytes, error).
+
+    Members are streamed to disk in chunks. The content goes to a temporary
+    folder next to `folder`, which is renamed into place only when the whole
+    archive was read, so a failure leaves neither a half-extracted folder nor
+    a missing archive; the error is returned as text instead of raised, to
+    come back from a worker process intact.
+    """
+    folder = os.path.abspath(folder)
+    partial = folder + '.partial'
+    try:
+        shutil.rmtree(partial, ignore_errors=True)
+        os.makedirs(partial)
+        with open(archive_path, 'rb') as file:
+            header = file.read(2)
+        if zipfile.is_zipfile(archive_path):
+            files, written = extract_zip(archive_path, partial)
+        elif tarfile.is_tarfile(archive_path):
+            files, written = extract_tar(archive_path, partial)
+        elif header == b'\x1f\x8b':
+            files, written = extract_gzip(archive_path, partial)
+        else:
+            raise ValueError("not a zip, tar or gzip archive")
+        os.replace(partial, folder)
+    # Any failure: encrypted zips raise RuntimeError, corrupt streams zlib.error,
+    # unknown compression methods NotImplementedError.
+    except Exception as e:
+        shutil.rmtree(partial, ignore_errors=True)
+        return archive_path, folder, 0, 0, f"{type(e).__name__}: {e}"
+    return archive_path, folder, files, written, None
+
+
+def extract_archives(jobs, workers=None):
+    """Extracts (archive, folder) jobs, several at once in a process pool.
+
+    Results come back in the order of the jobs. With one job or workers=1
+    everything runs in this process.
+    """
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        return [extract_archive(*job) for job in jobs]
+    with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+        return list(pool.map(extract_archive, *zip(*jobs)))
+
+
+class ExtractionStats:
+    """Sums extraction results into archives/s and MB/s."""
+
+    def __init__(self):
+        self.archives = self.files = self.bytes = self.failed = 0
+        self.seconds = 0.0
+
+    def add(self, results, seconds):
+        self.seconds += seconds
+        for _, _, files, written, error in results:
+            if error:
+                self.failed += 1
+            else:
+                self.archives += 1
+                self.files += files
+                self.bytes += written
+
+    def report(self):
+        seconds = max(self.seconds, 1e-9)
+        return (
+            f"Extracted {self.archives} archives ({self.files} files,"
+            f" {self.archives / seconds:.1f} archives/s,"
+            f" {self.bytes / seconds / 2**20:.1f} MB/s), {self.failed} failed"
+        )
+
+
+def make_synthetic_archives(folder, count, members=20, member_size=256 << 10):
+    """Writes `count` archives alternating zip and tar.gz, of compressible text."""
+    line = b'Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n'
+    data = (line * (member_size // len(line) + 1))[:member_size]
+    paths = []
+    for i in range(count):
+        if i % 2:
+            path = os.path.join(folder, f"archive_{i}.tar.gz")
+            with tarfile.open(path, 'w:gz') as archive:
+                for j in range(members):
+                    info = tarfile.TarInfo(f"data/file_{j}.txt")
+                    info.size = len(data)
+                    archive.addfile(info, io.BytesIO(data))
+        else:
+            path = os.path.join(folder, f"archive_{i}.zip")
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for j in range(members):
+                    archive.writestr(f"data/file_{j}.txt", data)
+        paths.append(path)
+    return paths
+
+
+def benchmark(count, workers):
+    """Prints extraction throughput with one process and with `workers`, and the speedup."""
+    with tempfile.TemporaryDirectory() as folder:
+        paths = make_synthetic_archives(folder, count)
+        timings = {}
+        for pool_size in dict.fromkeys((1, workers)):
+            out = os.path.join(folder, f"out_{pool_size}")
+            jobs = [(path, os.path.join(out, str(i))) for i, path in enumerate(paths)]
+            stats = ExtractionStats()
+            start = time.perf_counter()
+            results = extract_archives(jobs, pool_size)
+            stats.add(results, time.perf_counter() - start)
+            timings[pool_size] = stats.seconds
+            print(f"{pool_size} process(es): {stats.report()}")
+        print(
+            f"Speedup with {workers} processes: {timings[1] / timings[workers]:.2f}x"
+            f" ({os.cpu_count()} CPUs)"
+        )
+
+
+if __name__ == '__main__':
+    benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+        int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1),
+    )
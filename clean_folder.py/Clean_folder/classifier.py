@@ -0,0 +1,173 @@
+
+import json
+import mimetypes
+import os
+import sys
+import tempfile
+import time
+
+# Category -> file extensions. Names are matched case-insensitively.
+DEFAULT_CATEGORIES = {
+    'images': ('.jpeg', '.jpg', '.png', '.svg', '.gif', '.bmp', '.webp'),
+    'video': ('.avi', '.mp4', '.mov', '.mkv'),
+    'documents': ('.doc', '.docx', '.txt', '.pdf', '.xlsx', '.pptx'),
+    'audio': ('.mp3', '.ogg', '.wav', '.amr'),
+    'archives': ('.zip', '.gz', '.tar'),
+}
+
+# Magic numbers: ((offset, bytes), ...) that must all match -> categories the
+# content can belong to. The first category is used for files without a known
+# extension; the others are formats built on the same container (a .docx is a
+# zip), which a known extension may keep.
+DEFAULT_SIGNATURES = (
+    (((0, b'\xff\xd8\xff'),), ('images',)),
+    (((0, b'\x89PNG\r\n\x1a\n'),), ('images',)),
+    (((0, b'GIF87a'),), ('images',)),
+    (((0, b'GIF89a'),), ('images',)),
+    (((0, b'%PDF-'),), ('documents',)),
+    (((0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'),), ('documents',)),
+    (((0, b'PK\x03\x04'),), ('archives', 'documents')),
+    (((0, b'\x1f\x8b'),), ('archives',)),
+    (((257, b'ustar'),), ('archives',)),
+    (((0, b'ID3'),), ('audio',)),
+    (((0, b'\xff\xfb'),), ('audio',)),
+    (((0, b'\xff\xf3'),), ('audio',)),
+    (((0, b'\xff\xf2'),), ('audio',)),
+    (((0, b'OggS'),), ('audio', 'video')),
+    (((0, b'#!AMR'),), ('audio',)),
+    (((0, b'RIFF'), (8, b'WAVE')), ('audio',)),
+    (((0, b'RIFF'), (8, b'AVI ')), ('video',)),
+    (((4, b'ftyp'),), ('video', 'audio')),
+    (((0, b'\x1a\x45\xdf\xa3'),), ('video',)),
+)
+
+
+class Classifier:
+    """Maps files to category folders.
+
+    The extension table is a dict built once, so a file with a known extension
+    costs one lookup. Files without a known extension are sniffed: only the
+    first bytes are read and matched against magic numbers. With verify=True
+    files with a known extension are sniffed too, so a misleading extension is
+    corrected. classify() returns None for files it cannot place.
+    """
+
+    def __init__(self, categories=None, signatures=None, sniff=True, verify=False):
+        categories = DEFAULT_CATEGORIES if categories is None else categories
+        self.signatures = DEFAULT_SIGNATURES if signatures is None else signatures
+        self.by_extension = {
+            extension.lower(): category
+            for category, extensions in categories.items()
+            for extension in extensions
+        }
+        self.categories = tuple(categories)
+        self.sniff = sniff
+        self.verify = verify
+        self.header_size = max(
+            (offset + len(magic) for parts, _ in self.signatures for offset, magic in parts),
+            default=0,
+        )
+
+    @classmethod
+    def from_file(cls, path, **options):
+        """Reads rules from a JSON file: {"categories": {...}, "signatures": [...]}.
+
+        Signatures are [[[offset, "hex bytes"], ...], ["category", ...]]; either
+        key may be left out to keep the defaults.
+        """
+        with open(path, encoding='utf-8') as file:
+            rules = json.load(file)
+        signatures = rules.get('signatures')
+        if signatures is not None:
+            signatures = tuple(
+                (
+                    tuple((offset, bytes.fromhex(magic)) for offset, magic in parts),
+                    tuple(categories),
+                )
+                for parts, categories in signatures
+            )
+        return cls(rules.get('categories'), signatures, **options)
+
+    def by_name(self, name):
+        """Returns the category for the extension of `name`, without touching the file."""
+        return self.by_extension.get(os.path.splitext(name)[1].lower())
+
+    def classify(self, path, name=None):
+        category = self.by_name(name or path)
+        if not self.sniff or (category is not None and not self.verify):
+            return category
+        sniffed = self.sniff_file(path)
+        if sniffed is None or category in sniffed:
+            return category
+        return sniffed[0]
+
+    def sniff_file(self, path):
+        """Returns the categories the content of `path` can belong to, or None."""
+        try:
+            with open(path, 'rb') as file:
+                header = file.read(self.header_size)
+        except OSError:
+            return None
+        return self.match(header)
+
+    def match(self, header):
+        for parts, categories in self.signatures:
+            if all(header.startswith(magic, offset) for offset, magic in parts):
+                return categories
+        return None
+
+
+def mimetypes_classify(name):
+    """The per-file mimetypes lookup clean.py used before, kept for comparison."""
+    mime_type, _ = mimetypes.guess_type(name)
+    mime_type = mime_type.split('/')[1].upper() if mime_type else None
+    if mime_type in {'JPEG', 'PNG', 'JPG', 'SVG'}:
+        return 'images'
+    elif mime_type in {'AVI', 'MP4', 'MOV', 'MKV'}:
+        return 'video'
+    elif mime_type in {'DOC', 'DOCX', 'TXT', 'PDF', 'XLSX', 'PPTX'}:
+        return 'documents'
+    elif mime_type in {'MP3', 'OGG', 'WAV', 'AMR'}:
+        return 'audio'
+    elif mime_type in {'ZIP', 'GZ', 'TAR'}:
+        return 'archives'
+    return None
+
+
+def benchmark(count):
+    """Prints files/s for name lookups, sniffing and the old mimetypes lookup."""
+    classifier = Classifier()
+    headers = [magic for parts, _ in DEFAULT_SIGNATURES for offset, magic in parts if offset == 0]
+    extensions = [
+        extension for extensions in DEFAULT_CATEGORIES.values() for extension in extensions
+    ]
+    extensions += ['', '.bin', '.dat']
+    names = [f"plik_{i}{extensions[i % len(extensions)]}" for i in range(count)]
+
+    def files_per_second(func, items):
+        start = time.perf_counter()
+        placed = sum(func(item) is not None for item in items)
+        return len(items) / (time.perf_counter() - start), placed
+
+    rate, placed = files_per_second(mimetypes_classify, names)
+    print(f"mimetypes:          {rate:12.0f} files/s, {placed}/{count} placed")
+    rate, placed = files_per_second(classifier.by_name, names)
+    print(f"extension table:    {rate:12.0f} files/s, {placed}/{count} placed")
+
+    file_count = min(count, 20000)
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i, name in enumerate(names[:file_count]):
+            path = os.path.join(folder, name)
+            with open(path, 'wb') as file:
+                file.write(headers[i % len(headers)] + bytes(300))
+            paths.append(path)
+        rate, placed = files_per_second(classifier.classify, paths)
+        print(f"extension + sniff:  {rate:12.0f} files/s, {placed}/{file_count} placed")
+        verifying = Classifier(verify=True)
+        rate, placed = files_per_second(verifying.classify, paths)
+        print(f"sniff every file:   {rate:12.0f} files/s, {placed}/{file_count} placed")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
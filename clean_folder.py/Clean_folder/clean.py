@@ -1,7 +1,24 @@
 
+import argparse
+import json
 import os
-import shutil
-import mimetypes
+import sys
+import tempfile
+import time
+
+try:
+    from .archives import ExtractionStats, archive_stem, extract_archives
+    from .classifier import Classifier
+    from .mover import FileMover
+except ImportError:
+    from archives import ExtractionStats, archive_stem, extract_archives
+    from classifier import Classifier
+    from mover import FileMover
+
+PLAN_FILE = '.clean_folder_plan'
+JOURNAL_FILE = '.clean_folder_journal'
+BATCH_SIZE = 1000
+
 
 def normalize(name):
     
@@ -12,39 +29,207 @@ def normalize(name):
     
     return name
 
-def process_folder(folder_path):
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_extension = file.split('.')[-1].upper()
-            mime_type, _ = mimetypes.guess_type(file_path)
-            mime_type = mime_type.split('/')[1].upper() if mime_type else None
-            
-            if mime_type in {'JPEG', 'PNG', 'JPG', 'SVG'}:
-                target_folder = 'images'
-            elif mime_type in {'AVI', 'MP4', 'MOV', 'MKV'}:
-                target_folder = 'video'
-            elif mime_type in {'DOC', 'DOCX', 'TXT', 'PDF', 'XLSX', 'PPTX'}:
-                target_folder = 'documents'
-            elif mime_type in {'MP3', 'OGG', 'WAV', 'AMR'}:
-                target_folder = 'audio'
-            elif mime_type in {'ZIP', 'GZ', 'TAR'}:
-                target_folder = 'archives'
-                
-                archive_folder = os.path.splitext(file)[0]
-                archive_folder_path = os.path.join(root, archive_folder)
-                os.makedirs(archive_folder_path, exist_ok=True)
-                shutil.unpack_archive(file_path, archive_folder_path)
-            else:
-                target_folder = 'unknown'
-            
-            
-            if target_folder != 'unknown':
-                target_folder_path = os.path.join(root, target_folder)
-                os.makedirs(target_folder_path, exist_ok=True)
-                target_file_name = normalize(file)
-                target_file_path = os.path.join(target_folder_path, target_file_name)
-                shutil.move(file_path, target_file_path)
+def plan_folder(folder_path, classifier=None):
+    """Scans the tree without changing it and returns the list of operations.
+
+    Each operation is an (op, source, target) tuple: ('mkdir', '', folder),
+    ('extract', archive, folder) or ('move', file, target). Category folders
+    are not descended into, so files sorted by an earlier run stay where they are.
+    """
+    classifier = classifier or Classifier()
+    # Folders of the configured categories, which may come from --rules.
+    category_folders = {*classifier.categories, 'archives'}
+    plan = []
+    stack = [folder_path]
+    while stack:
+        root = stack.pop()
+        moves = []
+        names = set()
+        with os.scandir(root) as entries:
+            for entry in entries:
+                names.add(entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in category_folders:
+                        stack.append(entry.path)
+                    continue
+                if root == folder_path and entry.name in (PLAN_FILE, JOURNAL_FILE):
+                    continue
+                target_folder = classifier.classify(entry.path, entry.name)
+                if target_folder is not None:
+                    moves.append((entry.name, entry.path, target_folder))
+
+        folders = sorted({target_folder for _, _, target_folder in moves})
+        plan.extend(('mkdir', '', os.path.join(root, folder)) for folder in folders)
+        targets = set()
+        for name, path, target_folder in moves:
+            if target_folder == 'archives':
+                # A fresh folder name, so an existing target means "already extracted".
+                stem = folder = normalize(archive_stem(name))
+                suffix = 1
+                while folder in names:
+                    folder = f"{stem}_{suffix}"
+                    suffix += 1
+                names.add(folder)
+                plan.append(('extract', path, os.path.join(root, folder)))
+            target = os.path.join(root, target_folder, normalize(name))
+            # Two names can normalize to the same one; keep both files.
+            stem, extension = os.path.splitext(target)
+            suffix = 1
+            while target in targets:
+                target = f"{stem}_{suffix}{extension}"
+                suffix += 1
+            targets.add(target)
+            plan.append(('move', path, target))
+    return plan
+
+def describe(operation):
+    op, source, target = operation
+    if op == 'mkdir':
+        return f"mkdir   {target}"
+    return f"{op:<7} {source} -> {target}"
+
+def save_plan(folder_path, plan):
+    """Writes the plan next to the tree, atomically, and starts an empty journal."""
+    plan_path = os.path.join(folder_path, PLAN_FILE)
+    with open(plan_path + '.tmp', 'w', encoding='utf-8') as file:
+        file.writelines(json.dumps(operation) + '\n' for operation in plan)
+        file.flush()
+        os.fsync(file.fileno())
+    with open(os.path.join(folder_path, JOURNAL_FILE), 'w', encoding='utf-8'):
+        pass
+    os.replace(plan_path + '.tmp', plan_path)
+
+def load_plan(folder_path):
+    """Returns (plan, number of operations already done), or None without a saved plan."""
+    try:
+        with open(os.path.join(folder_path, PLAN_FILE), encoding='utf-8') as file:
+            plan = [tuple(json.loads(line)) for line in file]
+    except FileNotFoundError:
+        return None
+    done = 0
+    try:
+        with open(os.path.join(folder_path, JOURNAL_FILE), encoding='utf-8') as file:
+            for line in file:
+                # A line cut short by a crash is ignored; its batch is redone.
+                if line.endswith('\n'):
+                    done = int(line)
+    except FileNotFoundError:
+        pass
+    return plan, done
+
+def extract_batch(batch, stats):
+    """Extracts the archives of a batch together, reporting the ones that failed."""
+    jobs = [
+        (source, target) for op, source, target in batch
+        if op == 'extract' and os.path.exists(source) and not os.path.exists(target)
+    ]
+    if not jobs:
+        return
+    start = time.perf_counter()
+    results = extract_archives(jobs)
+    stats.add(results, time.perf_counter() - start)
+    for archive_path, _, _, _, error in results:
+        if error:
+            print(f"Could not extract {archive_path}, leaving it in place: {error}")
+
+def apply_operation(operation, mover):
+    op, source, target = operation
+    if op == 'mkdir':
+        mover.prepare([target])
+    elif os.path.exists(target) and not os.path.exists(source):
+        return
+    else:
+        try:
+            mover.move(source, target)
+        except FileNotFoundError:
+            # Removed since the plan was made; failing here would stop every resume.
+            print(f"Skipping {source}: it no longer exists")
+
+def execute_plan(folder_path, plan, done=0, batch_size=BATCH_SIZE, mover=None, stats=None):
+    """Applies the plan from operation `done` on, one batch at a time.
+
+    The archives of a batch are extracted first, in a process pool. An archive
+    whose extraction folder does not exist failed to extract and is not moved;
+    this holds across batches and resumed runs alike. The journal gets the
+    number of finished operations after every batch, so an interrupted run
+    resumes at the last finished batch. Operations are idempotent: a redone
+    move whose source is gone and target exists is skipped, and so is an
+    extraction whose folder exists. A file removed since planning is skipped
+    with a warning.
+    """
+    mover = mover or FileMover(folder_path)
+    stats = stats or ExtractionStats()
+    extracted_to = {source: target for op, source, target in plan if op == 'extract'}
+    with open(os.path.join(folder_path, JOURNAL_FILE), 'a', encoding='utf-8') as journal:
+        for start in range(done, len(plan), batch_size):
+            end = min(start + batch_size, len(plan))
+            batch = plan[start:end]
+            extract_batch(batch, stats)
+            for op, source, target in batch:
+                if op == 'extract':
+                    continue
+                if source in extracted_to and not os.path.isdir(extracted_to[source]):
+                    continue
+                apply_operation((op, source, target), mover)
+            journal.write(f"{end}\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+    os.remove(os.path.join(folder_path, PLAN_FILE))
+    os.remove(os.path.join(folder_path, JOURNAL_FILE))
+    return mover
+
+def process_folder(
+    folder_path, mover=None, batch_size=BATCH_SIZE, classifier=None, stats=None
+):
+    """Plans and sorts the tree, or finishes the plan of an interrupted run.
+
+    Folders extracted from archives are planned and sorted in a further round,
+    until a round extracts nothing.
+    """
+    mover = mover or FileMover(folder_path)
+    saved = load_plan(folder_path)
+    if saved is None:
+        plan, done = plan_folder(folder_path, classifier), 0
+        save_plan(folder_path, plan)
+    else:
+        plan, done = saved
+        print(f"Resuming: {done} of {len(plan)} operations already done")
+    while True:
+        execute_plan(folder_path, plan, done, batch_size, mover, stats)
+        extracted = [
+            target for op, _, target in plan if op == 'extract' and os.path.isdir(target)
+        ]
+        if not extracted:
+            return mover
+        plan, done = [op for folder in extracted for op in plan_folder(folder, classifier)], 0
+        save_plan(folder_path, plan)
+
+def make_synthetic_tree(folder_path, count, per_folder=100):
+    """Creates `count` empty files with mixed extensions in folders of `per_folder`."""
+    extensions = ('.jpg', '.png', '.mp4', '.txt', '.pdf', '.mp3', '.wav', '.zip', '.bin', '')
+    for i in range(count):
+        folder = os.path.join(folder_path, f"dir{i // per_folder:05d}")
+        if i % per_folder == 0:
+            os.makedirs(folder)
+        with open(os.path.join(folder, f"plik ż{i}{extensions[i % len(extensions)]}"), 'w'):
+            pass
+
+def benchmark_plan(count):
+    with tempfile.TemporaryDirectory() as folder_path:
+        make_synthetic_tree(folder_path, count)
+        start = time.perf_counter()
+        plan = plan_folder(folder_path)
+        planned = time.perf_counter() - start
+        start = time.perf_counter()
+        save_plan(folder_path, plan)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        plan, _ = load_plan(folder_path)
+        loaded = time.perf_counter() - start
+    print(
+        f"{count} files, {len(plan)} operations: plan {planned:.2f} s"
+        f" ({count / planned:.0f} files/s), save {saved:.2f} s, load {loaded:.2f} s"
+    )
 
 def clean_empty_folders(folder_path):
     for root, dirs, files in os.walk(folder_path, topdown=False):
@@ -53,15 +238,60 @@ def clean_empty_folders(folder_path):
             if not os.listdir(folder_path):
                 os.rmdir(folder_path)
 
-def main():
-    import sys
-    if len(sys.argv) != 2:
-        print("Usage: clean-folder <folder_path>")
-        sys.exit(1)
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='clean-folder', description="Sorts files into category folders"
+    )
+    parser.add_argument('folder_path', nargs='?')
+    parser.add_argument(
+        '--dry-run', action='store_true', help="print the plan without changing anything"
+    )
+    parser.add_argument(
+        '--restart', action='store_true', help="discard the plan of an interrupted run"
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=BATCH_SIZE, help="operations per journal entry"
+    )
+    parser.add_argument(
+        '--benchmark', type=int, metavar='COUNT', help="time planning a synthetic tree"
+    )
+    parser.add_argument('--rules', help="JSON file with the category and magic-number rules")
+    parser.add_argument(
+        '--no-sniff', action='store_true', help="classify by file extension only"
+    )
+    parser.add_argument(
+        '--verify', action='store_true', help="sniff files with known extensions too"
+    )
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        benchmark_plan(args.benchmark)
+        return
+    if args.folder_path is None or not os.path.isdir(args.folder_path):
+        parser.error("folder_path must be an existing folder")
 
-    folder_path = sys.argv[1]
-    process_folder(folder_path)
+    folder_path = args.folder_path
+    options = {'sniff': not args.no_sniff, 'verify': args.verify}
+    if args.rules:
+        classifier = Classifier.from_file(args.rules, **options)
+    else:
+        classifier = Classifier(**options)
+    if args.dry_run:
+        saved = load_plan(folder_path)
+        plan, done = saved if saved is not None else (plan_folder(folder_path, classifier), 0)
+        sys.stdout.writelines(describe(operation) + '\n' for operation in plan[done:])
+        print(f"{len(plan) - done} operations planned")
+        return
+    if args.restart:
+        for name in (PLAN_FILE, JOURNAL_FILE):
+            if os.path.exists(os.path.join(folder_path, name)):
+                os.remove(os.path.join(folder_path, name))
+    stats = ExtractionStats()
+    mover = process_folder(
+        folder_path, batch_size=args.batch_size, classifier=classifier, stats=stats
+    )
     clean_empty_folders(folder_path)
+    print(mover.report())
+    print(stats.report())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
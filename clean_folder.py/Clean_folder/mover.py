@@ -0,0 +1,107 @@
+
+import errno
+import os
+import shutil
+import time
+from collections import Counter
+
+
+class FileMover:
+    """Moves files into category folders and counts the system calls it makes.
+
+    The device of the source tree is read once and the device of each target
+    folder once, when the folder is prepared. Moves within one filesystem are a
+    single os.replace; moves to another one copy the data in chunks inside the
+    kernel (os.copy_file_range, else os.sendfile) and unlink the source.
+    """
+
+    CHUNK_SIZE = 8 << 20
+
+    def __init__(self, source_root):
+        self.source_device = os.stat(source_root).st_dev
+        self.same_device = {}
+        self.use_copy_file_range = hasattr(os, "copy_file_range")
+        self.syscalls = Counter({"stat": 1})
+        self.files = 0
+        self.copied_bytes = 0
+        self.start = time.perf_counter()
+
+    def prepare(self, folders):
+        """Creates target folders in one pass and records which are on our device."""
+        for folder in folders:
+            if folder in self.same_device:
+                continue
+            os.makedirs(folder, exist_ok=True)
+            self.same_device[folder] = os.stat(folder).st_dev == self.source_device
+            self.syscalls["mkdir"] += 1
+            self.syscalls["stat"] += 1
+
+    def move(self, source, target):
+        folder = os.path.dirname(target)
+        if folder not in self.same_device:
+            self.prepare([folder])
+        if self.same_device[folder]:
+            try:
+                os.replace(source, target)
+                self.syscalls["rename"] += 1
+                self.files += 1
+                return
+            except OSError as e:
+                # A bind mount can share the device and still refuse a rename.
+                if e.errno != errno.EXDEV:
+                    raise
+                self.same_device[folder] = False
+        self.copy(source, target)
+        os.unlink(source)
+        self.syscalls["unlink"] += 1
+        self.files += 1
+
+    def copy(self, source, target):
+        with open(source, "rb") as source_file, open(target, "wb") as target_file:
+            self.syscalls["open"] += 2
+            source_fd = source_file.fileno()
+            target_fd = target_file.fileno()
+            size = os.fstat(source_fd).st_size
+            self.syscalls["stat"] += 1
+            offset = 0
+            while offset < size:
+                count = min(self.CHUNK_SIZE, size - offset)
+                copied = self.copy_chunk(source_fd, target_fd, offset, count)
+                if not copied:
+                    break
+                offset += copied
+            self.copied_bytes += offset
+        shutil.copystat(source, target)
+
+    def copy_chunk(self, source_fd, target_fd, offset, count):
+        if self.use_copy_file_range:
+            try:
+                self.syscalls["copy_file_range"] += 1
+                return os.copy_file_range(source_fd, target_fd, count, offset, offset)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+                # Not supported between these filesystems; do not try it again.
+                self.use_copy_file_range = False
+        if hasattr(os, "sendfile"):
+            os.lseek(target_fd, offset, os.SEEK_SET)
+            self.syscalls["sendfile"] += 1
+            return os.sendfile(target_fd, source_fd, offset, count)
+        os.lseek(source_fd, offset, os.SEEK_SET)
+        os.lseek(target_fd, offset, os.SEEK_SET)
+        self.syscalls["read"] += 1
+        self.syscalls["write"] += 1
+        return os.write(target_fd, os.read(source_fd, count))
+
+    def report(self):
+        """Returns a line with the throughput and the system calls per file."""
+        seconds = max(time.perf_counter() - self.start, 1e-9)
+        files = max(self.files, 1)
+        calls = ", ".join(
+            f"{name} {count / files:.2f}" for name, count in sorted(self.syscalls.items())
+        )
+        return (
+            f"Moved {self.files} files ({self.files / seconds:.0f} files/s,"
+            f" copied {self.copied_bytes / seconds / 2**20:.1f} MB/s);"
+            f" syscalls per file: {calls}"
+        )
@@ -9,26 +9,25 @@ class AddressBook(UserDict):
 
     def find_records(self, search_term):
         results = []
-        for record in self.values():
+        for record in self.data.values():
             if search_term.lower() in record.name.value.lower():
                 results.append(record)
         return results
 
     def __iter__(self):
-        self.page = 0
-        self.current_page = self.paginate()
-        return self
-
-    def __next__(self):
-        if self.page < len(self.current_page):
-            record = self.current_page[self.page]
-            self.page += 1
-            return record
-        else:
-            raise StopIteration
-
-    def paginate(self):
-        return list(self.values())[self.page * self.page_size:(self.page + 1) * self.page_size]
+        for page in self.paginate():
+            yield from page
+
+    def paginate(self, page_size=None):
+        # The cursor is a snapshot of the keys, so adding or deleting records
+        # between pages is safe: deleted records are skipped, and records added
+        # after the first page are left for the next pagination.
+        keys = list(self.data)
+        size = page_size or self.page_size
+        for start in range(0, len(keys), size):
+            page = [self.data[key] for key in keys[start:start + size] if key in self.data]
+            if page:
+                yield page
 
 class Field:
     def __init__(self, value):
@@ -1,41 +1,158 @@
 
 from abc import ABC, abstractmethod
+import argparse
+from array import array
+import asyncio
+from bisect import bisect_left, bisect_right, insort
+import calendar
+from collections import OrderedDict, UserDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext, redirect_stdout
+import csv
+import heapq
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
 import re
 import pickle
-from datetime import datetime, timedelta
+import shlex
+import struct
+import sys
+import threading
+import time
+import unicodedata
+import zlib
+from datetime import date, datetime, timedelta
+
+
+PHONE_PATTERN = re.compile(r"^\d{9}$")
+# Spaces, dashes, dots, slashes and brackets people put between digits.
+PHONE_SEPARATORS = re.compile(r"[\s\-./()]")
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+# The same dates as datetime.strptime(value, "%Y-%m-%d") accepts, without its
+# per-call overhead.
+DATE_PATTERN = re.compile(r"(\d{4})-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])")
+
+
+def parse_date(value):
+    """Returns the date of a YYYY-MM-DD text or None if it is invalid."""
+    found = DATE_PATTERN.fullmatch(value)
+    if found is None:
+        return None
+    try:
+        return date(int(found[1]), int(found[2]), int(found[3]))
+    except ValueError:
+        return None
+
+
+def normalize_phone(value):
+    """Returns the canonical 9 digits of a phone number or None if it is invalid.
+
+    Separators and the +48 / 0048 country code are dropped, so "123-456-789"
+    and "+48 123 456 789" both become "123456789".
+    """
+    digits = PHONE_SEPARATORS.sub("", value)
+    if len(digits) == 12 and digits.startswith("+48"):
+        digits = digits[3:]
+    elif len(digits) == 13 and digits.startswith("0048"):
+        digits = digits[4:]
+    return digits if PHONE_PATTERN.match(digits) else None
+
+
+def validate_phones(values):
+    """Validates many phone numbers in one pass.
+
+    Returns a list of flags and a list of the canonical numbers, with None for
+    invalid ones.
+    """
+    normalized = [normalize_phone(value) for value in values]
+    return [value is not None for value in normalized], normalized
+
+
+def validate_emails(values):
+    """Validates many email addresses in one pass.
+
+    Returns a list of flags and a list of the values, with None for invalid ones.
+    """
+    match = EMAIL_PATTERN.match
+    normalized = [value if match(value) else None for value in values]
+    return [value is not None for value in normalized], normalized
+
+
+def validate_birthdays(values):
+    """Validates many YYYY-MM-DD dates in one pass.
+
+    Returns a list of flags and a list of parsed dates, with None for invalid ones.
+    """
+    dates = [parse_date(value) for value in values]
+    return [parsed is not None for parsed in dates], dates
+
+
+def trusted_field(cls, value):
+    """Creates a field from a value that was validated before it was stored."""
+    field = cls.__new__(cls)
+    field.value = value
+    return field
+
+
+def restore_slots(obj, state):
+    """Sets attributes of a slotted object from a slotted or dict-based pickle."""
+    if isinstance(state, tuple):
+        state = {**(state[0] or {}), **(state[1] or {})}
+    for name, value in state.items():
+        setattr(obj, name, value)
 
 
 class Field:
-    """Base class for entry fields."""
+    """Base class for entry fields.
+
+    Fields use __slots__ instead of a per-instance __dict__, which keeps books
+    with millions of contacts compact.
+    """
+
+    __slots__ = ("value",)
 
     def __init__(self, value):
         self.value = value
 
+    def __setstate__(self, state):
+        """Restores a pickled field, including ones saved before __slots__."""
+        restore_slots(self, state)
+
 
 class Name(Field):
     """Class for first and last name."""
 
-    pass
+    __slots__ = ()
 
 
 class Phone(Field):
-    """Class for phone number with validation."""
+    """Class for phone number with validation.
+
+    The number is stored in its canonical form, see `normalize_phone`.
+    """
+
+    __slots__ = ()
 
     def __init__(self, value):
-        if not self.validate_phone(value):
+        normalized = normalize_phone(value)
+        if normalized is None:
             raise ValueError("Niepoprawny numer telefonu")
-        super().__init__(value)
+        super().__init__(normalized)
 
     @staticmethod
     def validate_phone(value):
-        """Checks if the phone number is valid (9 digits, format 123456789)."""
-        pattern = re.compile(r"^\d{9}$")
-        return pattern.match(value) is not None
+        """Checks if the phone number is valid (9 digits, 123456789 or 123-456-789)."""
+        return normalize_phone(value) is not None
 
 
 class Email(Field):
     """Class for email address with validation."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         if not self.validate_email(value):
             raise ValueError("Niepoprawny adres email")
@@ -44,42 +161,87 @@ class Email(Field):
     @staticmethod
     def validate_email(value):
         """Checks if the email is valid."""
-        pattern = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
-        return pattern.match(value) is not None
+        return EMAIL_PATTERN.match(value) is not None
 
 
 class Birthday(Field):
-    """Class for birthday with validation."""
+    """Class for birthday with validation.
+
+    The text is parsed once and the resulting `date` is kept next to it.
+    """
+
+    __slots__ = ("date",)
 
     def __init__(self, value):
-        if not self.validate_birthday(value):
+        self.date = self.parse_birthday(value)
+        if self.date is None:
             raise ValueError("Niepoprawna data urodzenia")
         super().__init__(value)
 
+    def __setstate__(self, state):
+        """Restores a pickled birthday, parsing it if it was saved without `date`."""
+        restore_slots(self, state)
+        if not hasattr(self, "date"):
+            self.date = self.parse_birthday(self.value)
+
+    @staticmethod
+    def parse_birthday(value):
+        """Returns the date of a YYYY-MM-DD text or None if it is invalid."""
+        return parse_date(value)
+
     @staticmethod
     def validate_birthday(value):
         """Checks if the birthday is valid."""
+        return Birthday.parse_birthday(value) is not None
+
+
+def next_birthday(birth_date, today):
+    """Returns the date of the next birthday falling on or after today.
+
+    People born on February 29 celebrate on February 28 in non-leap years.
+    """
+    for year in (today.year, today.year + 1):
         try:
-            datetime.strptime(value, "%Y-%m-%d")
-            return True
+            candidate = birth_date.replace(year=year)
         except ValueError:
-            return False
+            candidate = date(year, 2, 28)
+        if candidate >= today:
+            return candidate
 
 
 class Address(Field):
-    """Class for residential address."""
+    """Class for residential address.
+
+    Only the parts are stored; `value` joins them on access. Cities, postal
+    codes and countries repeat across contacts, so they are interned.
+    """
+
+    __slots__ = ("street", "city", "postal_code", "country")
 
     def __init__(self, street, city, postal_code, country):
         self.street = street
-        self.city = city
-        self.postal_code = postal_code
-        self.country = country
-        super().__init__(f"{street}, {city}, {postal_code}, {country}")
+        self.city = sys.intern(city)
+        self.postal_code = sys.intern(postal_code)
+        self.country = sys.intern(country)
+
+    @property
+    def value(self):
+        return f"{self.street}, {self.city}, {self.postal_code}, {self.country}"
+
+    def __getstate__(self):
+        """Pickles only the parts of the address."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        """Restores a pickled address, dropping the joined value of old pickles."""
+        restore_slots(self, {name: state[name] for name in self.__slots__})
 
 
 class Record:
     """Class for an entry in the address book."""
 
+    __slots__ = ("name", "phones", "emails", "birthday", "address", "notes", "book")
+
     def __init__(self, name: Name, birthday: Birthday = None, address: Address = None):
         self.name = name
         self.phones = []
@@ -87,61 +249,153 @@ class Record:
         self.birthday = birthday
         self.address = address
         self.notes = []
+        self.book = None
+
+    def __getstate__(self):
+        """Pickles the record without the back-reference to its address book."""
+        return {name: getattr(self, name) for name in self.__slots__ if name != "book"}
+
+    def __setstate__(self, state):
+        """Restores a pickled record, including ones saved before __slots__."""
+        restore_slots(self, state)
+        self.book = None
+
+    def to_tuple(self):
+        """Returns the record as a tuple of plain values for the book file."""
+        birthday = self.birthday
+        address = self.address
+        return (
+            self.name.value,
+            tuple(phone.value for phone in self.phones),
+            tuple(email.value for email in self.emails),
+            (birthday.value, birthday.date.toordinal()) if birthday else None,
+            (address.street, address.city, address.postal_code, address.country)
+            if address
+            else None,
+            tuple(self.notes),
+        )
+
+    @classmethod
+    def from_tuple(cls, values):
+        """Rebuilds a record from `to_tuple` output without validating it again."""
+        name, phones, emails, birthday, address, notes = values
+        record = cls(trusted_field(Name, name))
+        record.phones = [trusted_field(Phone, phone) for phone in phones]
+        record.emails = [trusted_field(Email, email) for email in emails]
+        if birthday is not None:
+            record.birthday = trusted_field(Birthday, birthday[0])
+            record.birthday.date = date.fromordinal(birthday[1])
+        if address is not None:
+            record.address = Address(*address)
+        record.notes = list(notes)
+        return record
+
+    @contextmanager
+    def _changing(self):
+        """Keeps the indexes of the owning address book in sync with an edit."""
+        book = self.book
+        if book is None:
+            yield
+            return
+        with book._writing():
+            if self.book is not book:
+                yield
+                return
+            key = self.name.value
+            book._unindex(key, self)
+            try:
+                yield
+            finally:
+                book._reindex(key, self)
 
     def add_phone(self, phone: Phone):
         """Adds a phone number."""
-        self.phones.append(phone)
+        with self._changing():
+            self.phones.append(phone)
 
     def remove_phone(self, phone: Phone):
         """Removes a phone number."""
-        self.phones.remove(phone)
+        with self._changing():
+            self.phones.remove(phone)
 
     def edit_phone(self, old_phone: Phone, new_phone: Phone):
         """Changes a phone number."""
-        self.remove_phone(old_phone)
-        self.add_phone(new_phone)
+        with self._changing():
+            self.phones.remove(old_phone)
+            self.phones.append(new_phone)
 
     def add_email(self, email: Email):
         """Adds an email address."""
-        self.emails.append(email)
+        with self._changing():
+            self.emails.append(email)
 
     def remove_email(self, email: Email):
         """Removes an email address."""
-        self.emails.remove(email)
+        with self._changing():
+            self.emails.remove(email)
 
     def edit_email(self, old_email: Email, new_email: Email):
         """Changes an email address."""
-        self.remove_email(old_email)
-        self.add_email(new_email)
+        with self._changing():
+            self.emails.remove(old_email)
+            self.emails.append(new_email)
 
     def edit_name(self, new_name: Name):
-        """Changes the first and last name."""
-        self.name = new_name
+        """Changes the first and last name.
+
+        Raises ValueError if the book already has a contact with the new name.
+        """
+        with self._changing():
+            book = self.book
+            if (
+                book is not None
+                and new_name.value != self.name.value
+                and new_name.value in book.data
+            ):
+                raise ValueError("Kontakt o takim imieniu i nazwisku już istnieje")
+            self.name = new_name
+
+    def matches(self, search_term):
+        """Checks if the phrase occurs in the name, a phone number or an email."""
+        if search_term.lower() in self.name.value.lower():
+            return True
+        return any(search_term in phone.value for phone in self.phones) or any(
+            search_term in email.value for email in self.emails
+        )
 
-    def days_to_birthday(self):
+    def days_to_birthday(self, today=None):
         """Returns the number of days to the next birthday."""
         if not self.birthday or not self.birthday.value:
             return "Brak daty urodzenia"
-        today = datetime.now()
-        bday = datetime.strptime(self.birthday.value, "%Y-%m-%d")
-        next_birthday = bday.replace(year=today.year)
-        if today > next_birthday:
-            next_birthday = next_birthday.replace(year=today.year + 1)
-        days = (next_birthday - today).days
-        return days
+        today = today or datetime.now().date()
+        return (next_birthday(self.birthday.date, today) - today).days
+
+    def edit_birthday(self, new_birthday: Birthday):
+        """Changes the birthday."""
+        with self._changing():
+            self.birthday = new_birthday
 
     def edit_address(self, new_address: Address):
         """Changes the address."""
-        self.address = new_address
+        with self._changing():
+            self.address = new_address
 
     def __str__(self):
         """Returns a string representation of the entry, now including address."""
-        phones = ", ".join(phone.value for phone in self.phones)
-        emails = ", ".join(email.value for email in self.emails)
+        return self.format()
+
+    def format(self, today=None, days=None):
+        """Returns the text of __str__.
+
+        Renderers of many records pass `today`, and `days` to the birthday if
+        they computed it already.
+        """
+        phones = ", ".join([phone.value for phone in self.phones])
+        emails = ", ".join([email.value for email in self.emails])
         birthday_str = f", Urodziny: {self.birthday.value}" if self.birthday else ""
-        days_to_bday_str = (
-            f", Dni do urodzin: {self.days_to_birthday()}" if self.birthday else ""
-        )
+        if days is None and self.birthday:
+            days = self.days_to_birthday(today)
+        days_to_bday_str = f", Dni do urodzin: {days}" if self.birthday else ""
         address_str = f", Adres: {self.address.value}" if self.address else ""
         return (
             f"Imię i nazwisko: {self.name.value}, "
@@ -150,7 +404,8 @@ class Record:
 
     def add_note(self, note):
         """Adds a note to the record."""
-        self.notes.append(note)
+        with self._changing():
+            self.notes.append(note)
 
     def show_notes(self):
         """Shows all notes associated with the record."""
@@ -162,93 +417,1043 @@ class Record:
                 print(note)
 
 
+class NgramIndex:
+    """Inverted n-gram index over the names, phones and emails of the records.
+
+    Every value is case-folded and split into overlapping n-grams; each n-gram
+    maps to the set of keys of the records containing it. Values shorter than
+    `n` cannot produce an n-gram, so their keys are kept in `short_keys`.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.postings = {}
+        self.short_keys = set()
+
+    @staticmethod
+    def record_values(record):
+        """Yields the searchable values of a record, case-folded."""
+        yield record.name.value.casefold()
+        for phone in record.phones:
+            yield phone.value.casefold()
+        for email in record.emails:
+            yield email.value.casefold()
+
+    def grams(self, text):
+        """Returns the set of n-grams of the text."""
+        n = self.n
+        return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, key, record):
+        """Adds the values of a record under the given key."""
+        for value in self.record_values(record):
+            if len(value) < self.n:
+                self.short_keys.add(key)
+            for gram in self.grams(value):
+                keys = self.postings.get(gram)
+                if keys is None:
+                    self.postings[gram] = {key}
+                else:
+                    keys.add(key)
+
+    def remove(self, key, record):
+        """Removes the values of a record stored under the given key."""
+        self.short_keys.discard(key)
+        for value in self.record_values(record):
+            for gram in self.grams(value):
+                keys = self.postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[gram]
+
+    def candidates(self, search_term):
+        """Returns keys of records that may contain the phrase.
+
+        The result is a superset of the matches, so every candidate still has
+        to be checked with `Record.matches`. None means the index cannot narrow
+        the search (empty phrase) and all records are candidates.
+        """
+        term = search_term.casefold()
+        if not term:
+            return None
+        if len(term) >= self.n:
+            postings = sorted(
+                (self.postings.get(gram, ()) for gram in self.grams(term)), key=len
+            )
+            if not postings[0]:
+                return set()
+            return set(postings[0]).intersection(*postings[1:])
+        keys = set(self.short_keys)
+        for gram, gram_keys in self.postings.items():
+            if term in gram:
+                keys.update(gram_keys)
+        return keys
+
+
+class BirthdayIndex:
+    """Birthday calendar: one bucket of record keys per day of a leap year."""
+
+    def __init__(self):
+        self.buckets = [set() for _ in range(366)]
+
+    @staticmethod
+    def slot(month, day):
+        """Returns the bucket number of a month and day (February 29 included)."""
+        return date(2000, month, day).timetuple().tm_yday - 1
+
+    @staticmethod
+    def birth_date(record):
+        """Returns the birth date of a record or None if it has none."""
+        if not record.birthday or not record.birthday.value:
+            return None
+        return record.birthday.date
+
+    def add(self, key, record):
+        """Puts the record key into the bucket of its birthday."""
+        bday = self.birth_date(record)
+        if bday is not None:
+            self.buckets[self.slot(bday.month, bday.day)].add(key)
+
+    def remove(self, key, record):
+        """Takes the record key out of the bucket of its birthday."""
+        bday = self.birth_date(record)
+        if bday is not None:
+            self.buckets[self.slot(bday.month, bday.day)].discard(key)
+
+    def between(self, start, end):
+        """Yields (date, keys) for every day from start to end inclusive.
+
+        At most one year of days is walked, so the cost is O(days + hits) and
+        every key is yielded once. Birthdays on February 29 are reported on
+        February 28 in non-leap years.
+        """
+        seen = set()
+        day = start
+        stop = min(end, start + timedelta(days=365))
+        while day <= stop:
+            keys = self.buckets[self.slot(day.month, day.day)]
+            if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+                keys = keys | self.buckets[self.slot(2, 29)]
+            keys = keys - seen
+            if keys:
+                seen |= keys
+                yield day, keys
+            day += timedelta(days=1)
+
+
+class QueryCache:
+    """LRU cache of query results with hit, miss and eviction counters.
+
+    Every entry remembers the generation of the book it was computed for and,
+    for queries relative to today, the day. An entry from an older generation
+    or an earlier day is a miss, so any change of the book or midnight
+    invalidates exactly the results that could be out of date. A mutex makes
+    the cache safe to use from many reader threads at once.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, generation, day=None):
+        """Returns the cached result or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == generation and entry[1] == day:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, key, generation, day, result):
+        """Stores a result, evicting the least recently used one if full."""
+        with self.lock:
+            self.entries[key] = (generation, day, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops all results."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Returns the counters and the current size."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+            }
+
+
+class InsertionOrder:
+    """Insertion numbers of the book keys, seekable by a cursor in O(log N).
+
+    `keys` and `numbers` are parallel lists in insertion order. Deleting or
+    moving a key leaves a stale entry behind that readers skip; the lists are
+    compacted once stale entries outnumber live ones. Cursors are insertion
+    numbers, not positions, so compaction does not invalidate them.
+    """
+
+    def __init__(self):
+        self.numbers_by_key = {}
+        self.keys = []
+        self.numbers = []
+        self.counter = itertools.count()
+
+    def add(self, key):
+        """Gives the key the next insertion number."""
+        number = next(self.counter)
+        self.numbers_by_key[key] = number
+        self.keys.append(key)
+        self.numbers.append(number)
+
+    def __getitem__(self, key):
+        return self.numbers_by_key[key]
+
+    def __delitem__(self, key):
+        del self.numbers_by_key[key]
+        if len(self.keys) > 2 * len(self.numbers_by_key) + 64:
+            self.compact()
+
+    def compact(self):
+        """Drops stale entries."""
+        live = [
+            (number, key)
+            for number, key in zip(self.numbers, self.keys)
+            if self.numbers_by_key.get(key) == number
+        ]
+        self.numbers = [number for number, _ in live]
+        self.keys = [key for _, key in live]
+
+    def after(self, cursor, limit):
+        """Returns up to `limit` (number, key) pairs inserted after the cursor."""
+        found = []
+        position = bisect_right(self.numbers, cursor)
+        while position < len(self.keys) and len(found) < limit:
+            key = self.keys[position]
+            number = self.numbers[position]
+            if self.numbers_by_key.get(key) == number:
+                found.append((number, key))
+            position += 1
+        return found
+
+
+def normalize_name(text):
+    """Case-folds the text and strips diacritics, e.g. "Łukasz Żak" -> "lukasz zak"."""
+    text = text.casefold().replace("ł", "l")
+    if text.isascii():
+        return text
+    return "".join(
+        char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+    )
+
+
+def edit_distance(first, second, max_distance):
+    """Returns the edit distance (with adjacent transpositions) of two words.
+
+    Any distance above max_distance is reported as max_distance + 1.
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    previous_row = None
+    row = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, start=1):
+        before_row, previous_row, row = previous_row, row, [i] + [0] * len(second)
+        for j, second_char in enumerate(second, start=1):
+            cost = first_char != second_char
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if (
+                before_row is not None
+                and j > 1
+                and first_char == second[j - 2]
+                and first[i - 2] == second_char
+            ):
+                row[j] = min(row[j], before_row[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+    return min(row[-1], max_distance + 1)
+
+
+class FuzzyIndex:
+    """Typo-tolerant index of name words (a SymSpell deletion dictionary).
+
+    Every distinct normalized word is stored under all variants obtained by
+    deleting up to `max_distance` letters. Words within that edit distance of
+    a query word share at least one variant with it, so a lookup only
+    compares the query with a handful of candidate words.
+    """
+
+    def __init__(self, max_distance=2):
+        self.max_distance = max_distance
+        self.postings = {}
+        self.variants = {}
+
+    def deletes(self, word):
+        """Returns the word and all its variants with up to max_distance deletions."""
+        found = {word}
+        current = {word}
+        for _ in range(self.max_distance):
+            current = {
+                variant[:i] + variant[i + 1 :]
+                for variant in current
+                for i in range(len(variant))
+            }
+            found |= current
+        return found
+
+    def add(self, key, record):
+        """Adds the name words of a record."""
+        for word in normalize_name(record.name.value).split():
+            keys = self.postings.get(word)
+            if keys is None:
+                self.postings[word] = {key}
+                for variant in self.deletes(word):
+                    self.variants.setdefault(variant, set()).add(word)
+            else:
+                keys.add(key)
+
+    def remove(self, key, record):
+        """Removes the name words of a record."""
+        for word in normalize_name(record.name.value).split():
+            keys = self.postings.get(word)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self.postings[word]
+                for variant in self.deletes(word):
+                    words = self.variants[variant]
+                    words.discard(word)
+                    if not words:
+                        del self.variants[variant]
+
+    def similar_words(self, word):
+        """Returns {indexed word: distance} for words close enough to the word."""
+        candidates = set()
+        for variant in self.deletes(word):
+            candidates.update(self.variants.get(variant, ()))
+        similar = {}
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, self.max_distance)
+            if distance <= self.max_distance:
+                similar[candidate] = distance
+        return similar
+
+    def search(self, query):
+        """Returns {key: distance} of records matching every word of the query.
+
+        The distance of a record is the sum of the distances of the query words
+        to the closest words of its name.
+        """
+        scores = None
+        for word in normalize_name(query).split():
+            word_scores = {}
+            for similar, distance in self.similar_words(word).items():
+                for key in self.postings[similar]:
+                    if distance < word_scores.get(key, self.max_distance + 1):
+                        word_scores[key] = distance
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {
+                    key: scores[key] + distance
+                    for key, distance in word_scores.items()
+                    if key in scores
+                }
+        return scores or {}
+
+
+class SortedIndex:
+    """Secondary index of one field: (value, key) pairs kept in sorted order.
+
+    The pairs are stored in sorted blocks of up to 2 * BLOCK_SIZE entries, so
+    an insert or a delete shifts one block and not the whole index. Records
+    without a value for the field are not indexed.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self, field_value):
+        self.field_value = field_value
+        self.blocks = []
+        self.maxes = []
+
+    def build(self, items):
+        """Fills the index from (key, record) pairs in one sort."""
+        entries = []
+        for key, record in items:
+            value = self.field_value(record)
+            if value is not None:
+                entries.append((value, key))
+        entries.sort()
+        size = self.BLOCK_SIZE
+        self.blocks = [entries[i : i + size] for i in range(0, len(entries), size)]
+        self.maxes = [block[-1] for block in self.blocks]
+
+    def add(self, key, record):
+        """Inserts the value of a record."""
+        value = self.field_value(record)
+        if value is None:
+            return
+        entry = (value, key)
+        if not self.blocks:
+            self.blocks.append([entry])
+            self.maxes.append(entry)
+            return
+        i = min(bisect_left(self.maxes, entry), len(self.maxes) - 1)
+        block = self.blocks[i]
+        insort(block, entry)
+        self.maxes[i] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = block[self.BLOCK_SIZE :]
+            del block[self.BLOCK_SIZE :]
+            self.blocks.insert(i + 1, half)
+            self.maxes[i] = block[-1]
+            self.maxes.insert(i + 1, half[-1])
+
+    def remove(self, key, record):
+        """Deletes the value of a record."""
+        value = self.field_value(record)
+        if value is None:
+            return
+        entry = (value, key)
+        i = bisect_left(self.maxes, entry)
+        if i == len(self.maxes):
+            return
+        block = self.blocks[i]
+        j = bisect_left(block, entry)
+        if j < len(block) and block[j] == entry:
+            del block[j]
+            if block:
+                self.maxes[i] = block[-1]
+            else:
+                del self.blocks[i]
+                del self.maxes[i]
+
+    def entries_from(self, low=None):
+        """Yields (value, key) pairs in order, starting at the first value >= low."""
+        i = j = 0
+        if low is not None:
+            i = bisect_left(self.maxes, (low,))
+            if i < len(self.blocks):
+                j = bisect_left(self.blocks[i], (low,))
+        for block in self.blocks[i:]:
+            yield from block[j:]
+            j = 0
+
+    def range(self, low=None, high=None):
+        """Yields keys with low <= value <= high; a missing bound is open."""
+        for value, key in self.entries_from(low):
+            if high is not None and value > high:
+                return
+            yield key
+
+    def prefix(self, prefix):
+        """Yields keys whose text value starts with the prefix."""
+        for value, key in self.entries_from(prefix):
+            if not value.startswith(prefix):
+                return
+            yield key
+
+
+class PhoneIndex:
+    """Reverse phone index: which records own a number or a number prefix.
+
+    Every phone is packed into one unsigned 64-bit integer, the number shifted
+    left by 32 bits plus the slot of the record key, and kept in sorted blocks
+    of `array("Q")` like SortedIndex. That is 8 bytes per phone and one slot per
+    record with phones; lookups are O(log N + hits). Numbers are the canonical
+    9 digits of `normalize_phone`, so a prefix is a range of integers.
+    """
+
+    BLOCK_SIZE = 1024
+    DIGITS = 9
+
+    def __init__(self):
+        self.blocks = []
+        self.maxes = []
+        self.slots = {}
+        self.keys = []
+        self.free = []
+
+    def add(self, key, record):
+        """Inserts the phones of a record."""
+        if not record.phones:
+            return
+        if self.free:
+            slot = self.free.pop()
+            self.keys[slot] = key
+        else:
+            slot = len(self.keys)
+            self.keys.append(key)
+        self.slots[key] = slot
+        for phone in record.phones:
+            self.insert(int(phone.value) << 32 | slot)
+
+    def remove(self, key, record):
+        """Deletes the phones of a record and frees its slot."""
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        for phone in record.phones:
+            self.delete(int(phone.value) << 32 | slot)
+        self.keys[slot] = None
+        self.free.append(slot)
+
+    def insert(self, entry):
+        if not self.blocks:
+            self.blocks.append(array("Q", [entry]))
+            self.maxes.append(entry)
+            return
+        i = min(bisect_left(self.maxes, entry), len(self.maxes) - 1)
+        block = self.blocks[i]
+        block.insert(bisect_left(block, entry), entry)
+        self.maxes[i] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = block[self.BLOCK_SIZE :]
+            del block[self.BLOCK_SIZE :]
+            self.blocks.insert(i + 1, half)
+            self.maxes[i] = block[-1]
+            self.maxes.insert(i + 1, half[-1])
+
+    def delete(self, entry):
+        i = bisect_left(self.maxes, entry)
+        if i == len(self.maxes):
+            return
+        block = self.blocks[i]
+        j = bisect_left(block, entry)
+        if j < len(block) and block[j] == entry:
+            del block[j]
+            if block:
+                self.maxes[i] = block[-1]
+            else:
+                del self.blocks[i]
+                del self.maxes[i]
+
+    def entries_between(self, low, high):
+        """Yields packed entries with low <= entry < high, in order."""
+        i = bisect_left(self.maxes, low)
+        j = bisect_left(self.blocks[i], low) if i < len(self.blocks) else 0
+        for block in self.blocks[i:]:
+            for position in range(j, len(block)):
+                entry = block[position]
+                if entry >= high:
+                    return
+                yield entry
+            j = 0
+
+    def numbers_between(self, low, high):
+        """Yields (number, key) for numbers from low to high inclusive."""
+        for entry in self.entries_between(low << 32, (high + 1) << 32):
+            yield entry >> 32, self.keys[entry & 0xFFFFFFFF]
+
+    def lookup(self, number):
+        """Returns the keys of records with the number (an int), in number order."""
+        return [key for _, key in self.numbers_between(number, number)]
+
+    def prefix(self, digits):
+        """Yields (number, key) for numbers starting with the digits."""
+        missing = self.DIGITS - len(digits)
+        if missing < 0:
+            return iter(())
+        low = int(digits) * 10**missing if digits else 0
+        return self.numbers_between(low, low + 10**missing - 1)
+
+    def items(self):
+        """Yields all (number, key) pairs in number order."""
+        return self.numbers_between(0, 10**self.DIGITS - 1)
+
+
+SORTABLE_FIELDS = {
+    "name": lambda record: record.name.value,
+    "city": lambda record: record.address.city if record.address else None,
+    "postal_code": lambda record: record.address.postal_code if record.address else None,
+    "birthday": lambda record: record.birthday.date if record.birthday else None,
+}
+
+
+class PageIterator:
+    """Iterator over pages of address book records with its own cursor.
+
+    The cursor is the insertion number of the last record returned, so each
+    page costs O(page_size) and records added or deleted between pages do not
+    shift the next page. A renamed record moves to the end of the book.
+    """
+
+    def __init__(self, book, page_size=5, cursor=-1):
+        self.book = book
+        self.page_size = page_size
+        self.cursor = cursor
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.cursor, page = self.book._page_after(self.cursor, self.page_size)
+        if not page:
+            raise StopIteration
+        return page
+
+
 class AddressBook(UserDict):
     """Class for the address book."""
 
+    def __init__(self, *args, **kwargs):
+        self._search_index = NgramIndex()
+        self._birthday_index = BirthdayIndex()
+        self._fuzzy_index = FuzzyIndex()
+        self._phone_index = PhoneIndex()
+        self._indexes = [
+            self._search_index,
+            self._birthday_index,
+            self._fuzzy_index,
+            self._phone_index,
+        ]
+        self._sorted_indexes = {}
+        self._order = InsertionOrder()
+        self._ordered = True
+        self._indexed = True
+        self.journal = None
+        self.generation = 0
+        self.query_cache = QueryCache()
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def lazy(cls, records):
+        """Creates a book over MappedRecords without reading the records.
+
+        Records are materialized when accessed; the insertion order and the
+        indexes are built on the first query that needs them.
+        """
+        book = cls()
+        book.data = records
+        book._ordered = False
+        book._indexed = False
+        records.on_load = book._adopt
+        for record in records.loaded.values():
+            book._adopt(record)
+        return book
+
+    def _writing(self):
+        """Returns the context a Record edit runs in; see ConcurrentAddressBook."""
+        return nullcontext()
+
+    def _adopt(self, record):
+        """Makes a record read from the book file report its edits to this book."""
+        record.book = self
+
+    def _ensure_ordered(self):
+        """Numbers the keys of a lazily opened book without reading the records."""
+        if self._ordered:
+            return
+        for key in self.data:
+            self._order.add(key)
+        self._ordered = True
+
+    def _ensure_indexed(self):
+        """Builds the indexes of a lazily opened book."""
+        if self._indexed:
+            return
+        self._ensure_ordered()
+        for key, record in self.data.items():
+            for index in self._indexes:
+                index.add(key, record)
+        self._indexed = True
+
+    def __setitem__(self, key, record):
+        """Stores a record under its key and indexes it."""
+        if key in self.data:
+            del self[key]
+        record.book = self
+        self.data[key] = record
+        self.generation += 1
+        if self._ordered:
+            self._order.add(key)
+        if self._indexed:
+            for index in self._indexes:
+                index.add(key, record)
+        if self.journal is not None:
+            self.journal.append("set", key, record)
+
+    def __delitem__(self, key):
+        """Removes a record and its index entries."""
+        record = self.data.pop(key)
+        self.generation += 1
+        if self._ordered:
+            del self._order[key]
+        if self._indexed:
+            for index in self._indexes:
+                index.remove(key, record)
+        record.book = None
+        if self.journal is not None:
+            self.journal.append("del", key)
+
+    def _unindex(self, key, record):
+        """Removes a record from the indexes before it is edited."""
+        if self._indexed:
+            for index in self._indexes:
+                index.remove(key, record)
+
+    def _reindex(self, old_key, record):
+        """Indexes an edited record again, moving it if its name changed."""
+        self.generation += 1
+        key = record.name.value
+        if key != old_key:
+            del self.data[old_key]
+            if self._ordered:
+                del self._order[old_key]
+            # edit_name refuses names taken by another contact.
+            self.data[key] = record
+            if self._ordered:
+                self._order.add(key)
+            if self.journal is not None:
+                self.journal.append("del", old_key)
+        if self._indexed:
+            for index in self._indexes:
+                index.add(key, record)
+        if self.journal is not None:
+            self.journal.append("set", key, record)
+
     def add_record(self, record: Record):
         """Adds an entry to the address book."""
-        self.data[record.name.value] = record
+        self[record.name.value] = record
         print("Dodano wpis.")
 
-    def show_all_records(self):
+    def add_records(self, records):
+        """Adds many entries without printing, journaling them with one flush."""
+        journal, self.journal = self.journal, None
+        added = []
+        try:
+            for record in records:
+                self[record.name.value] = record
+                added.append(("set", record.name.value, record))
+        finally:
+            self.journal = journal
+            if journal is not None:
+                journal.append_batch(added)
+
+    def stream_records(self):
+        """Yields all records; a lazily opened book does not keep them in memory."""
+        if isinstance(self.data, MappedRecords):
+            return self.data.stream()
+        return iter(self.data.values())
+
+    def show_all_records(self, fmt="text", limit=None, output=None):
+        """Streams the records to the output (stdout by default); see render_records."""
+        output = output or sys.stdout
         if not self.data:
-            print("Brak kontaktów")
-        else:
-            print("Kontakty: ")
-            for i, (name, record) in enumerate(self.data.items(), start=1):
-                print(f"{i}. {name}: {record}")
+            print("Brak kontaktów", file=output)
+            return 0
+        if fmt == "text":
+            output.write("Kontakty: \n")
+        return render_records(self.stream_records(), output, fmt, limit, show_name=True)
+
+    def _cached(self, key, compute, day=None):
+        """Returns a copy of the cached result of a query, computing it on a miss."""
+        result = self.query_cache.get(key, self.generation, day)
+        if result is None:
+            result = compute()
+            self.query_cache.put(key, self.generation, day, result)
+        return list(result)
 
     def find_record(self, search_term):
         """Finds entries containing the exact phrase provided."""
-        found_records = []
-        for record in self.data.values():
-            if search_term.lower() in record.name.value.lower():
-                found_records.append(record)
-                continue
-            for phone in record.phones:
-                if search_term in phone.value:
-                    found_records.append(record)
-                    break
-            for email in record.emails:
-                if search_term in email.value:
-                    found_records.append(record)
-                    break
-        return found_records
+        return self._cached(("find", search_term), lambda: self._find_record(search_term))
 
-    def upcoming_birthdays(self, days):
-        today = datetime.now().date()
-        days = int(days)
-        print(today)
-        upcoming_birthdays = []
-        for record in self.data.values():
-            if record.birthday:
-
-                bday = datetime.strptime(record.birthday.value, "%Y-%m-%d").date()
-                print(bday)
-                next_birthday = bday.replace(year=today.year)
-                if today > next_birthday:
-                    next_birthday = next_birthday.replace(year=today.year + 1)
+    def _find_record(self, search_term):
+        self._ensure_indexed()
+        keys = self._search_index.candidates(search_term)
+        if keys is None:
+            records = self.data.values()
+        else:
+            records = (
+                self.data[key] for key in sorted(keys, key=self._order.__getitem__)
+            )
+        return [record for record in records if record.matches(search_term)]
 
-                days_to = (next_birthday - today).days
-                print(days_to)
-                if (next_birthday - today).days <= days:
-                    upcoming_birthdays.append(record.name.value)
+    def birthdays_between(self, start, end):
+        """Returns (date, record) pairs of birthdays from start to end, soonest first."""
+        self._ensure_indexed()
+        return [
+            (day, self.data[key])
+            for day, keys in self._birthday_index.between(start, end)
+            for key in sorted(keys, key=self._order.__getitem__)
+        ]
 
-        element = ", ".join(upcoming_birthdays)
-        print(f"W ciągu najblizszych {days} dni, urodziny mają: \n{element}")
+    def upcoming_birthdays(self, days):
+        days = int(days)
+        names = ", ".join(
+            record.name.value for record in self.find_by_birthday_range(days)
+        )
+        print(f"W ciągu najblizszych {days} dni, urodziny mają: \n{names}")
 
     def delete_record(self, name):
         """Deletes a record by name."""
         if name in self.data:
-            del self.data[name]
+            del self[name]
             print(f"Usunięto wpis: {name}.")
         else:
             print(f"Wpis o nazwie {name} nie istnieje.")
 
     def __iter__(self):
-        """Returns an iterator over the address book records."""
-        self.current = 0
-        return self
+        """Returns an iterator over pages of 5 address book records."""
+        return self.pages()
+
+    def pages(self, page_size=5, cursor=-1):
+        """Returns a new iterator over pages of records, starting after the cursor."""
+        self._ensure_ordered()
+        return PageIterator(self, page_size, cursor)
+
+    def _page_after(self, cursor, page_size):
+        """Returns the new cursor and the records of the page after the cursor."""
+        entries = self._order.after(cursor, page_size)
+        if not entries:
+            return cursor, []
+        return entries[-1][0], [self.data[key] for _, key in entries]
+
+    def create_index(self, field, field_value=None):
+        """Declares a sorted index on a field of SORTABLE_FIELDS.
+
+        Any other field needs `field_value`, a function returning the value of
+        a record (or None). The index is then kept up to date on every change.
+        """
+        if field_value is None:
+            if field not in SORTABLE_FIELDS:
+                raise ValueError(f"Nieznane pole: {field}")
+            field_value = SORTABLE_FIELDS[field]
+        self._ensure_indexed()
+        self.drop_index(field)
+        index = SortedIndex(field_value)
+        index.build(self.data.items())
+        self._sorted_indexes[field] = index
+        self._indexes.append(index)
+
+    def drop_index(self, field):
+        """Removes the sorted index of a field, if there is one."""
+        index = self._sorted_indexes.pop(field, None)
+        if index is not None:
+            self._indexes.remove(index)
+
+    def _sorted_index(self, field):
+        if field not in self._sorted_indexes:
+            raise ValueError(f"Brak indeksu dla pola: {field}")
+        return self._sorted_indexes[field]
+
+    def find_fuzzy(self, query, limit=10):
+        """Finds names close to the query despite typos and missing diacritics.
+
+        Returns up to `limit` (distance, record) pairs, closest first.
+        """
+        key = ("fuzzy", " ".join(normalize_name(query).split()), limit)
+        return self._cached(key, lambda: self._find_fuzzy(query, limit))
+
+    def _find_fuzzy(self, query, limit):
+        self._ensure_indexed()
+        scores = self._fuzzy_index.search(query)
+        best = heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (item[1], self._order[item[0]])
+        )
+        return [(distance, self.data[key]) for key, distance in best]
+
+    def find_by_range(self, field, low=None, high=None):
+        """Lazily yields records with low <= field value <= high, in field order."""
+        for key in self._sorted_index(field).range(low, high):
+            yield self.data[key]
+
+    def find_by_prefix(self, field, prefix):
+        """Lazily yields records whose field value starts with the prefix."""
+        for key in self._sorted_index(field).prefix(prefix):
+            yield self.data[key]
+
+    def find_by_phone(self, phone):
+        """Returns the records owning a phone number, in any accepted format."""
+        normalized = normalize_phone(phone)
+        if normalized is None:
+            raise ValueError("Niepoprawny numer telefonu")
+        self._ensure_indexed()
+        return [self.data[key] for key in self._phone_index.lookup(int(normalized))]
 
-    def __next__(self):
-        if self.current < len(self.data):
-            records = list(self.data.values())[self.current : self.current + 5]
-            self.current += 5
-            return records
-        else:
-            raise StopIteration
+    def find_by_phone_prefix(self, prefix):
+        """Lazily yields (phone, record) pairs of numbers starting with the digits."""
+        digits = PHONE_SEPARATORS.sub("", prefix)
+        if not digits.isdigit():
+            raise ValueError("Niepoprawny numer telefonu")
+        self._ensure_indexed()
+        for number, key in self._phone_index.prefix(digits):
+            yield f"{number:09d}", self.data[key]
 
     def find_by_birthday_range(self, days):
         """Finds contacts with birthdays within the specified range of days."""
-        found_contacts = []
-        for record in self.data.values():
-            days_to_birthday = record.days_to_birthday()
-            if (
-                days_to_birthday != "Brak daty urodzenia"
-                and 0 <= days_to_birthday <= days
-            ):
-                found_contacts.append(record)
-        return found_contacts
+        today = datetime.now().date()
+        return self._cached(
+            ("birthdays", days),
+            lambda: [
+                record
+                for _, record in self.birthdays_between(today, today + timedelta(days=days))
+            ],
+            day=today,
+        )
+
+
+class ReadWriteLock:
+    """Lock shared by many readers or held by one writer.
+
+    Waiting writers go before new readers, so a stream of queries cannot
+    starve them. A thread may take the lock again while it holds it: for
+    reading or writing once it writes, and for reading once it reads.
+    Taking the write lock while only reading would deadlock.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = None
+        self.writer_depth = 0
+        self.waiting_writers = 0
+        self.local = threading.local()
+
+    @contextmanager
+    def reading(self):
+        """Holds the lock for reading."""
+        depth = getattr(self.local, "read_depth", 0)
+        if depth or self.writer == threading.get_ident():
+            self.local.read_depth = depth + 1
+            try:
+                yield
+            finally:
+                self.local.read_depth = depth
+            return
+        with self.condition:
+            while self.writer is not None or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        self.local.read_depth = 1
+        try:
+            yield
+        finally:
+            self.local.read_depth = 0
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """Holds the lock for writing."""
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer == me:
+                self.writer_depth += 1
+            else:
+                self.waiting_writers += 1
+                while self.writer is not None or self.readers:
+                    self.condition.wait()
+                self.waiting_writers -= 1
+                self.writer = me
+                self.writer_depth = 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer_depth -= 1
+                if not self.writer_depth:
+                    self.writer = None
+                    self.condition.notify_all()
+
+
+class ConcurrentAddressBook(AddressBook):
+    """Address book that can be shared between threads.
+
+    Queries run under the shared side of a ReadWriteLock, so their results
+    come from one consistent state of the book. Inserts, deletes and Record
+    edits take the exclusive side. Page iterators keep their own cursor and
+    lock each page separately; range and prefix queries return an iterator
+    over a snapshot taken under the lock.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lock = ReadWriteLock()
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def lazy(cls, records):
+        """Opens MappedRecords and builds the indexes up front.
+
+        Lazy index building would mutate the book under the shared lock.
+        """
+        book = super().lazy(records)
+        book._ensure_indexed()
+        return book
+
+    def _writing(self):
+        return self.lock.writing()
+
+    def __setitem__(self, key, record):
+        with self.lock.writing():
+            super().__setitem__(key, record)
+
+    def __delitem__(self, key):
+        with self.lock.writing():
+            super().__delitem__(key)
+
+    def add_records(self, records):
+        with self.lock.writing():
+            super().add_records(records)
+
+    def create_index(self, field, field_value=None):
+        with self.lock.writing():
+            super().create_index(field, field_value)
+
+    def drop_index(self, field):
+        with self.lock.writing():
+            super().drop_index(field)
+
+    def find_record(self, search_term):
+        with self.lock.reading():
+            return super().find_record(search_term)
+
+    def find_fuzzy(self, query, limit=10):
+        with self.lock.reading():
+            return super().find_fuzzy(query, limit)
+
+    def birthdays_between(self, start, end):
+        with self.lock.reading():
+            return super().birthdays_between(start, end)
+
+    def find_by_birthday_range(self, days):
+        with self.lock.reading():
+            return super().find_by_birthday_range(days)
+
+    def find_by_range(self, field, low=None, high=None):
+        with self.lock.reading():
+            return iter(list(super().find_by_range(field, low, high)))
+
+    def find_by_prefix(self, field, prefix):
+        with self.lock.reading():
+            return iter(list(super().find_by_prefix(field, prefix)))
+
+    def find_by_phone(self, phone):
+        with self.lock.reading():
+            return super().find_by_phone(phone)
+
+    def find_by_phone_prefix(self, prefix):
+        with self.lock.reading():
+            return iter(list(super().find_by_phone_prefix(prefix)))
+
+    def _page_after(self, cursor, page_size):
+        with self.lock.reading():
+            return super()._page_after(cursor, page_size)
 
 
 def edit_record(book):
@@ -262,8 +1467,11 @@ def edit_record(book):
             "Podaj imię i nazwisko (wciśnij Enter żeby zachować obecne): "
         )
         if new_name_input.strip():
-            record.edit_name(Name(new_name_input))
-            print("Zaktualizowano imię i nazwisko.")
+            try:
+                record.edit_name(Name(new_name_input))
+                print("Zaktualizowano imię i nazwisko.")
+            except ValueError as e:
+                print(f"Błąd: {e}")
 
         if record.phones:
             print("Obecne numery telefonów: ")
@@ -294,29 +1502,1560 @@ def edit_record(book):
         print("Wpisu nie znaleziono.")
 
 
+BOOK_MAGIC = b"ABOOK\x00\x00\x01"
+BOOK_HEADER = struct.Struct("<8sQQ")
+BOOK_ENTRY = struct.Struct("<HI")
+BOOK_OFFSET = struct.Struct("<Q")
+
+
+class MappedRecords(MutableMapping):
+    """Records of a book file, read through a memory map only when accessed.
+
+    File layout (little-endian):
+        header:  magic, record count, offset of the table
+        bodies:  name length (u16), body length (u32), UTF-8 name,
+                 pickled `Record.to_tuple()`, in insertion order
+        table:   body offsets (u64) sorted by name, for binary search
+
+    Changes are kept in memory on top of the file: materialized and changed
+    records in `loaded`, keys missing from the file in `added` and removed
+    file keys in `deleted`.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.loaded = {}
+        self.on_load = None
+        self.open()
+
+    def open(self):
+        """Maps the file and forgets changes it already contains."""
+        self.file = open(self.filename, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.table_offset = BOOK_HEADER.unpack_from(self.map, 0)
+        if magic != BOOK_MAGIC:
+            self.close()
+            raise ValueError(f"{self.filename} nie jest plikiem książki adresowej")
+        self.added = {}
+        self.deleted = set()
+
+    def close(self):
+        """Unmaps the file."""
+        self.map.close()
+        self.file.close()
+
+    def _name_at(self, offset):
+        name_length, _ = BOOK_ENTRY.unpack_from(self.map, offset)
+        start = offset + BOOK_ENTRY.size
+        return self.map[start : start + name_length]
+
+    def _body_at(self, offset):
+        name_length, body_length = BOOK_ENTRY.unpack_from(self.map, offset)
+        start = offset + BOOK_ENTRY.size + name_length
+        return self.map[start : start + body_length]
+
+    def _find(self, key):
+        """Returns the body offset of a key stored in the file or None."""
+        name = key.encode()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = BOOK_OFFSET.unpack_from(
+                self.map, self.table_offset + middle * BOOK_OFFSET.size
+            )[0]
+            middle_name = self._name_at(offset)
+            if middle_name == name:
+                return offset
+            if middle_name < name:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _file_entries(self):
+        """Yields (key, offset) of the records in the file, in file order."""
+        offset = BOOK_HEADER.size
+        while offset < self.table_offset:
+            name_length, body_length = BOOK_ENTRY.unpack_from(self.map, offset)
+            start = offset + BOOK_ENTRY.size
+            yield self.map[start : start + name_length].decode(), offset
+            offset = start + name_length + body_length
+
+    def __getitem__(self, key):
+        record = self.loaded.get(key)
+        if record is not None:
+            return record
+        offset = None if key in self.deleted else self._find(key)
+        if offset is None:
+            raise KeyError(key)
+        record = Record.from_tuple(pickle.loads(self._body_at(offset)))
+        # setdefault: readers racing on one key must share a single record.
+        record = self.loaded.setdefault(key, record)
+        if self.on_load is not None:
+            self.on_load(record)
+        return record
+
+    def __setitem__(self, key, record):
+        if key in self.deleted:
+            self.deleted.discard(key)
+        elif key not in self.loaded and self._find(key) is None:
+            self.added[key] = None
+        self.loaded[key] = record
+
+    def __delitem__(self, key):
+        if key in self.added:
+            del self.added[key]
+            del self.loaded[key]
+        elif key in self.loaded or (
+            key not in self.deleted and self._find(key) is not None
+        ):
+            self.loaded.pop(key, None)
+            self.deleted.add(key)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.loaded:
+            return True
+        return key not in self.deleted and self._find(key) is not None
+
+    def __iter__(self):
+        for key, _ in self._file_entries():
+            if key not in self.deleted:
+                yield key
+        yield from list(self.added)
+
+    def __len__(self):
+        return self.count - len(self.deleted) + len(self.added)
+
+    def stream(self):
+        """Yields the records without keeping the ones read from the file."""
+        for key, offset in self._file_entries():
+            if key in self.deleted:
+                continue
+            record = self.loaded.get(key)
+            if record is None:
+                record = Record.from_tuple(pickle.loads(self._body_at(offset)))
+            yield record
+        for key in list(self.added):
+            yield self.loaded[key]
+
+    def raw_items(self):
+        """Yields (key, body) pairs, copying bodies of untouched records as is."""
+        for key, offset in self._file_entries():
+            if key in self.deleted:
+                continue
+            record = self.loaded.get(key)
+            if record is None:
+                yield key, self._body_at(offset)
+            else:
+                yield key, pickle.dumps(record.to_tuple())
+        for key in self.added:
+            yield key, pickle.dumps(self.loaded[key].to_tuple())
+
+
+def write_book_file(filename, records):
+    """Writes records (a dict or MappedRecords) in the memory-mapped book format."""
+    if isinstance(records, MappedRecords):
+        items = records.raw_items()
+    else:
+        items = ((key, pickle.dumps(record.to_tuple())) for key, record in records.items())
+    positions = []
+    with open(filename, "wb") as file:
+        file.write(BOOK_HEADER.pack(BOOK_MAGIC, 0, 0))
+        offset = BOOK_HEADER.size
+        for key, body in items:
+            name = key.encode()
+            file.write(BOOK_ENTRY.pack(len(name), len(body)))
+            file.write(name)
+            file.write(body)
+            positions.append((name, offset))
+            offset += BOOK_ENTRY.size + len(name) + len(body)
+        positions.sort()
+        file.write(struct.pack(f"<{len(positions)}Q", *(pos for _, pos in positions)))
+        file.seek(0)
+        file.write(BOOK_HEADER.pack(BOOK_MAGIC, len(positions), offset))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def read_book_file(filename):
+    """Opens a book file: MappedRecords for the binary format, a dict for a pickle."""
+    with open(filename, "rb") as file:
+        magic = file.read(len(BOOK_MAGIC))
+        if magic != BOOK_MAGIC:
+            file.seek(0)
+            return pickle.load(file)
+    return MappedRecords(filename)
+
+
+class Journal:
+    """Write-ahead journal of address book changes next to a snapshot.
+
+    Every change appends one small pickled entry, ("set", key, values) or
+    ("del", key, None), to `<filename>.journal`, where values come from
+    `Record.to_tuple`. Loading replays the journal on top of the snapshot.
+    Compaction writes a new snapshot in the memory-mapped book format to a
+    temporary file, renames it over the old one and empties the journal, so a
+    crash never leaves a half-written snapshot. Entries are idempotent, so a
+    crash between the rename and emptying the journal is harmless. Older
+    snapshots that are plain pickles of the records dict are still read.
+
+    With `autoflush` off, appends stay in the file buffer until `sync`; a
+    server syncing in the background trades the last moments of changes for
+    one write per interval instead of one per change.
+    """
+
+    def __init__(self, filename, compact_every=10_000):
+        self.filename = filename
+        self.journal_filename = filename + ".journal"
+        self.compact_every = compact_every
+        self.entries = 0
+        self.file = None
+        self.autoflush = True
+
+    def load(self):
+        """Returns the snapshot with the journal replayed on top of it.
+
+        A torn entry at the end of the journal (a crash mid-append) is cut off.
+        """
+        try:
+            data = read_book_file(self.filename)
+        except FileNotFoundError:
+            data = {}
+        valid_size = 0
+        try:
+            with open(self.journal_filename, "rb") as file:
+                while True:
+                    try:
+                        op, key, values = pickle.load(file)
+                    except (EOFError, pickle.UnpicklingError):
+                        break
+                    valid_size = file.tell()
+                    self.entries += 1
+                    if op == "set":
+                        data[key] = Record.from_tuple(values)
+                    elif key in data:
+                        del data[key]
+        except FileNotFoundError:
+            pass
+        self.file = open(self.journal_filename, "ab")
+        self.file.truncate(valid_size)
+        return data
+
+    def append(self, op, key, record=None):
+        """Appends one change and hands it to the operating system."""
+        self.append_batch([(op, key, record)])
+
+    def append_batch(self, changes):
+        """Appends (op, key, record) changes with a single flush."""
+        if self.file is None:
+            self.file = open(self.journal_filename, "ab")
+        for op, key, record in changes:
+            values = record.to_tuple() if record is not None else None
+            pickle.dump((op, key, values), self.file)
+            self.entries += 1
+        if self.autoflush:
+            self.file.flush()
+
+    def sync(self):
+        """Forces the journal to disk."""
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def compact(self, data):
+        """Replaces the snapshot atomically with `data` and empties the journal."""
+        temp_filename = self.filename + ".tmp"
+        write_book_file(temp_filename, data)
+        if isinstance(data, MappedRecords) and data.filename == self.filename:
+            data.close()
+            os.replace(temp_filename, self.filename)
+            data.open()
+        else:
+            os.replace(temp_filename, self.filename)
+        if self.file is None:
+            self.file = open(self.journal_filename, "ab")
+        self.file.truncate(0)
+        self.sync()
+        self.entries = 0
+
+    def close(self):
+        """Closes the journal file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
 def save_address_book(book, filename="address_book.pkl"):
+    """Saves the book: syncs its journal, compacting it into a snapshot if long.
+
+    Books without a journal for this file get a full snapshot and a journal.
+    """
     try:
-        with open(filename, "wb") as file:
-            pickle.dump(book.data, file)
+        journal = book.journal
+        if journal is None or journal.filename != filename:
+            if journal is not None:
+                journal.close()
+            book.journal = Journal(filename)
+            book.journal.compact(book.data)
+        elif journal.entries >= journal.compact_every:
+            journal.compact(book.data)
+        else:
+            journal.sync()
         print("Zapisano liste adresową.")
     except Exception as e:
         print(f"Błąd przy zapisie liście kontaktów: {e}")
 
 
 def load_address_book(filename="address_book.pkl"):
+    """Loads the snapshot, replays its journal and keeps journaling changes."""
+    journal = Journal(filename)
     try:
-        with open(filename, "rb") as file:
-            data = pickle.load(file)
-        book = AddressBook()
-        book.data = data
-        print("Witam w Osobistym asystencie.")
-        return book
-    except FileNotFoundError:
-        print("Plik nie istnieje, tworzenie nowej listy kontaktów.")
-        return AddressBook()
+        data = journal.load()
+        if isinstance(data, MappedRecords):
+            book = AddressBook.lazy(data)
+        else:
+            book = AddressBook(data)
     except Exception as e:
         print(f"Błąd przy ładowaniu listy kontaktów: {e}")
+        journal.close()
         return AddressBook()
+    book.journal = journal
+    if os.path.exists(filename) or journal.entries:
+        print("Witam w Osobistym asystencie.")
+    else:
+        print("Plik nie istnieje, tworzenie nowej listy kontaktów.")
+    return book
+
+
+def shard_of(key, shards):
+    """Returns the shard owning a key; stable across processes, unlike hash()."""
+    return zlib.crc32(key.encode()) % shards
+
+
+def run_shard(filename, shard, shards, connection):
+    """Holds one shard of a book file and answers its queries until stopped.
+
+    The worker maps the file itself and walks the names of all entries, but
+    decodes only the records it owns, so no record crosses a pipe on start.
+    Records travel as `Record.to_tuple()` values paired with their number:
+    the position in the file for loaded records, assigned by the parent for
+    later writes, so the parent can merge the shards in book order.
+    """
+    records = MappedRecords(filename)
+    book = AddressBook()
+    numbers = {}
+    for number, (key, offset) in enumerate(records._file_entries()):
+        if shard_of(key, shards) == shard:
+            book[key] = Record.from_tuple(pickle.loads(records._body_at(offset)))
+            numbers[key] = number
+    records.close()
+    connection.send(len(book.data))
+    while True:
+        op, args = connection.recv()
+        try:
+            if op == "stop":
+                break
+            if op == "set":
+                for number, values in args:
+                    record = Record.from_tuple(values)
+                    book[record.name.value] = record
+                    numbers[record.name.value] = number
+                result = len(book.data)
+            elif op == "del":
+                del book[args]
+                del numbers[args]
+                result = len(book.data)
+            elif op == "find":
+                result = [
+                    (numbers[record.name.value], record.to_tuple())
+                    for record in book.find_record(args)
+                ]
+            elif op == "fuzzy":
+                result = [
+                    (distance, numbers[record.name.value], record.to_tuple())
+                    for distance, record in book.find_fuzzy(*args)
+                ]
+            elif op == "birthdays":
+                result = [
+                    (day, numbers[record.name.value], record.to_tuple())
+                    for day, record in book.birthdays_between(*args)
+                ]
+            else:
+                result = ValueError(f"Nieznana operacja: {op}")
+        except Exception as e:
+            # Any failure is the answer to this query; the worker keeps serving.
+            result = e
+        try:
+            connection.send(result)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            connection.send(RuntimeError(f"{type(result).__name__}: {result}"))
+    connection.close()
+
+
+class ShardedAddressBook:
+    """Address book partitioned by name across worker processes.
+
+    Opening replays and compacts the journal, then starts one `run_shard`
+    worker per shard over the resulting book file. Queries fan out to all
+    workers, which search their slices in parallel, and the partial results
+    are merged in the order a single AddressBook would return. Writes go to
+    the shard owning the name and to the journal kept by this process.
+    Returned records are copies: change a record by storing it again.
+
+    Workers are forked, so this needs a platform with fork (Linux, macOS).
+    """
+
+    def __init__(self, filename="address_book.pkl", shards=None):
+        self.shards = shards or os.cpu_count()
+        self.journal = Journal(filename)
+        data = self.journal.load()
+        if self.journal.entries or not isinstance(data, MappedRecords):
+            self.journal.compact(data)
+        if isinstance(data, MappedRecords):
+            data.close()
+        records = MappedRecords(filename)
+        self.next_number = records.count
+        records.close()
+        context = multiprocessing.get_context("fork")
+        self.connections = []
+        self.processes = []
+        for shard in range(self.shards):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=run_shard,
+                args=(filename, shard, self.shards, worker_connection),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.sizes = [connection.recv() for connection in self.connections]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the workers and closes the journal."""
+        for connection in self.connections:
+            connection.send(("stop", None))
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+        self.journal.close()
+
+    def _call(self, shard, op, args):
+        self.connections[shard].send((op, args))
+        return self._result(shard)
+
+    def _result(self, shard):
+        result = self.connections[shard].recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _fan_out(self, op, args):
+        """Sends a query to every shard first, then collects the answers.
+
+        Every shard's answer is read before an error is raised, so no stale
+        answer is left in a pipe for the next query.
+        """
+        for connection in self.connections:
+            connection.send((op, args))
+        results = [connection.recv() for connection in self.connections]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def __len__(self):
+        return sum(self.sizes)
+
+    def __setitem__(self, key, record):
+        """Stores a record in the shard owning its key."""
+        self.add_records([record])
+
+    def __delitem__(self, key):
+        shard = shard_of(key, self.shards)
+        self.sizes[shard] = self._call(shard, "del", key)
+        self.journal.append("del", key)
+
+    def add_records(self, records):
+        """Adds many records with one message per shard and one journal flush."""
+        batches = [[] for _ in range(self.shards)]
+        changes = []
+        for record in records:
+            key = record.name.value
+            batch = batches[shard_of(key, self.shards)]
+            batch.append((self.next_number, record.to_tuple()))
+            self.next_number += 1
+            changes.append(("set", key, record))
+        for shard, batch in enumerate(batches):
+            if batch:
+                self.connections[shard].send(("set", batch))
+        for shard, batch in enumerate(batches):
+            if batch:
+                self.sizes[shard] = self._result(shard)
+        self.journal.append_batch(changes)
+
+    def find_record(self, search_term):
+        """Finds entries containing the exact phrase, in book order."""
+        found = heapq.merge(*self._fan_out("find", search_term))
+        return [Record.from_tuple(values) for _, values in found]
+
+    def find_fuzzy(self, query, limit=10):
+        """Returns up to `limit` (distance, record) pairs, closest first."""
+        best = heapq.nsmallest(
+            limit, itertools.chain(*self._fan_out("fuzzy", (query, limit)))
+        )
+        return [(distance, Record.from_tuple(values)) for distance, _, values in best]
+
+    def birthdays_between(self, start, end):
+        """Returns (date, record) pairs of birthdays from start to end, soonest first."""
+        found = heapq.merge(*self._fan_out("birthdays", (start, end)))
+        return [(day, Record.from_tuple(values)) for day, _, values in found]
+
+    def find_by_birthday_range(self, days):
+        """Finds contacts with birthdays within the specified range of days."""
+        today = datetime.now().date()
+        return [
+            record
+            for _, record in self.birthdays_between(today, today + timedelta(days=days))
+        ]
+
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def note_words(text):
+    """Returns the distinct words of a text, case-folded and without diacritics."""
+    return set(WORD_PATTERN.findall(normalize_name(text)))
+
+
+def normalize_tag(tag):
+    """Returns a tag without a leading '#', case-folded; raises ValueError if empty."""
+    normalized = tag.strip().lstrip("#").casefold()
+    if not normalized:
+        raise ValueError("Pusty tag")
+    return normalized
+
+
+class Note:
+    """A note with an id, a creation time and tags."""
+
+    __slots__ = ("id", "content", "created_at", "tags", "notebook")
+
+    def __init__(self, content, created_at=None, tags=()):
+        self.id = None
+        self.content = content
+        self.created_at = created_at or datetime.now()
+        self.tags = [normalize_tag(tag) for tag in tags]
+        self.notebook = None
+
+    def add_tag(self, tag):
+        """Adds a tag, through the notebook if the note belongs to one."""
+        if self.notebook is not None:
+            self.notebook.add_tag(self.id, tag)
+        elif normalize_tag(tag) not in self.tags:
+            self.tags.append(normalize_tag(tag))
+
+    def to_tuple(self):
+        """Returns the note as a tuple of plain values for the notes file."""
+        return (self.id, self.content, self.created_at, tuple(self.tags))
+
+    @classmethod
+    def from_tuple(cls, values):
+        """Rebuilds a note from `to_tuple` output."""
+        note_id, content, created_at, tags = values
+        note = cls(content, created_at)
+        note.id = note_id
+        note.tags = list(tags)
+        return note
+
+    def __str__(self):
+        tags = " ".join(f"#{tag}" for tag in self.tags)
+        created = f"{self.created_at:%Y-%m-%d %H:%M}"
+        return f"[{self.id}] {created} {self.content} {tags}".rstrip()
+
+
+class Notebook:
+    """Notes with ids, a full-text word index and a tag index.
+
+    Word postings are `array("I")` of note ids in increasing order: ids only
+    grow, so indexing a new note appends. Deleted notes leave stale ids that
+    searches skip; the word postings are rebuilt once half of them are stale.
+    Tags map to sets of ids, since a tag can be added to an old note.
+
+    After `save_notes` or `load_notes` every change is appended to
+    `<filename>.journal` as a small pickled entry; saving writes a snapshot
+    and empties the journal, loading replays the journal on the snapshot.
+    The snapshot holds the postings too, so loading does not tokenize notes.
+    """
+
+    def __init__(self):
+        self.notes = {}
+        self.next_id = 1
+        self.word_postings = {}
+        self.tag_postings = {}
+        self.postings_size = 0
+        self.stale = 0
+        self.journal = None
+
+    def __len__(self):
+        return len(self.notes)
+
+    def _log(self, entry):
+        if self.journal is not None:
+            pickle.dump(entry, self.journal)
+            self.journal.flush()
+
+    def _insert(self, note):
+        note.notebook = self
+        self.notes[note.id] = note
+        self.next_id = max(self.next_id, note.id + 1)
+        for word in note_words(note.content):
+            self.word_postings.setdefault(word, array("I")).append(note.id)
+            self.postings_size += 1
+        for tag in note.tags:
+            self.tag_postings.setdefault(tag, set()).add(note.id)
+
+    def _remove(self, note_id):
+        note = self.notes.pop(note_id)
+        note.notebook = None
+        self.stale += len(note_words(note.content))
+        for tag in note.tags:
+            self.tag_postings[tag].discard(note_id)
+            if not self.tag_postings[tag]:
+                del self.tag_postings[tag]
+        if self.stale * 2 > self.postings_size:
+            self._rebuild_word_postings()
+
+    def _rebuild_word_postings(self):
+        """Drops stale ids by indexing the remaining notes again."""
+        self.word_postings = {}
+        self.postings_size = self.stale = 0
+        for note in self.notes.values():
+            for word in note_words(note.content):
+                self.word_postings.setdefault(word, array("I")).append(note.id)
+                self.postings_size += 1
+
+    def add_note(self, note_content, tags=()):
+        """Adds a note and returns it with its new id."""
+        note = Note(note_content, tags=tags)
+        note.id = self.next_id
+        self._insert(note)
+        self._log(("add", note.to_tuple()))
+        return note
+
+    def delete_note(self, note_id):
+        """Deletes a note; returns False if there is no note with the id."""
+        if note_id not in self.notes:
+            return False
+        self._remove(note_id)
+        self._log(("del", note_id))
+        return True
+
+    def add_tag(self, note_id, tag):
+        """Tags a note; raises ValueError if there is no note with the id."""
+        if note_id not in self.notes:
+            raise ValueError(f"Notatka {note_id} nie istnieje")
+        tag = normalize_tag(tag)
+        note = self.notes[note_id]
+        if tag in note.tags:
+            return
+        note.tags.append(tag)
+        self.tag_postings.setdefault(tag, set()).add(note_id)
+        self._log(("tag", note_id, tag))
+
+    def search_notes(self, query):
+        """Returns notes containing every word of the query, oldest first."""
+        words = note_words(query)
+        if not words:
+            return []
+        postings = sorted((self.word_postings.get(word, ()) for word in words), key=len)
+        found = []
+        for note_id in postings[0]:
+            # Postings are sorted, so membership in the others is a bisection.
+            if note_id in self.notes and all(
+                (i := bisect_left(ids, note_id)) < len(ids) and ids[i] == note_id
+                for ids in postings[1:]
+            ):
+                found.append(self.notes[note_id])
+        return found
+
+    def search_tag(self, tag):
+        """Returns the notes with a tag, oldest first."""
+        ids = self.tag_postings.get(normalize_tag(tag), ())
+        return [self.notes[note_id] for note_id in sorted(ids)]
+
+    def sort_tags(self):
+        """Returns {tag: notes} for all tags in alphabetical order."""
+        return {tag: self.search_tag(tag) for tag in sorted(self.tag_postings)}
+
+    def show_notes(self):
+        if not self.notes:
+            print("Brak notatek.")
+        for note in self.notes.values():
+            print(note)
+
+    def save_notes(self, filename="notes.pkl"):
+        """Writes a snapshot atomically and starts an empty journal next to it."""
+        temp_filename = filename + ".tmp"
+        with open(temp_filename, "wb") as file:
+            state = (
+                self.next_id,
+                [note.to_tuple() for note in self.notes.values()],
+                self.word_postings,
+                self.tag_postings,
+                self.postings_size,
+                self.stale,
+            )
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, filename)
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = open(filename + ".journal", "wb")
+
+    def load_notes(self, filename="notes.pkl"):
+        """Replaces the notes with the snapshot and its replayed journal.
+
+        A torn entry at the end of the journal (a crash mid-append) is cut off.
+        """
+        if self.journal is not None:
+            self.journal.close()
+        self.__init__()
+        try:
+            with open(filename, "rb") as file:
+                state = pickle.load(file)
+        except FileNotFoundError:
+            state = (1, [], {}, {}, 0, 0)
+        self.next_id, notes, self.word_postings, self.tag_postings = state[:4]
+        self.postings_size, self.stale = state[4:]
+        for values in notes:
+            note = Note.from_tuple(values)
+            note.notebook = self
+            self.notes[note.id] = note
+        valid_size = 0
+        try:
+            with open(filename + ".journal", "rb") as file:
+                while True:
+                    try:
+                        entry = pickle.load(file)
+                    except (EOFError, pickle.UnpicklingError):
+                        break
+                    valid_size = file.tell()
+                    if entry[0] == "add":
+                        self._insert(Note.from_tuple(entry[1]))
+                    elif entry[0] == "del":
+                        if entry[1] in self.notes:
+                            self._remove(entry[1])
+                    elif entry[1] in self.notes:
+                        note = self.notes[entry[1]]
+                        if entry[2] not in note.tags:
+                            note.tags.append(entry[2])
+                            self.tag_postings.setdefault(entry[2], set()).add(entry[1])
+        except FileNotFoundError:
+            pass
+        self.journal = open(filename + ".journal", "ab")
+        self.journal.truncate(valid_size)
+
+
+class Tag:
+    """Tag manager of a notebook; the notebook keeps the tag index."""
+
+    def __init__(self, notes: Notebook):
+        self.notes = notes
+
+    def add_tag(self, note_index, tag):
+        """Tags the note with the id."""
+        self.notes.add_tag(note_index, tag)
+
+    def search_tag(self, tag):
+        """Returns the notes with a tag."""
+        return self.notes.search_tag(tag)
+
+    def sort_tags(self):
+        """Returns {tag: notes} for all tags in alphabetical order."""
+        return self.notes.sort_tags()
+
+
+def notes_menu(notebook, ui):
+    """Runs one action of the notes submenu."""
+    print("1. Dodaj notatkę")
+    print("2. Pokaż notatki")
+    print("3. Szukaj w treści")
+    print("4. Dodaj tag")
+    print("5. Szukaj po tagu")
+    print("6. Notatki według tagów")
+    print("7. Usuń notatkę")
+    choice = ui.get_user_input("Wybierz opcję: ")
+    try:
+        if choice == "1":
+            content = ui.get_user_input("Treść notatki: ")
+            tags = ui.get_user_input("Tagi oddzielone spacją (opcjonalnie): ").split()
+            note = notebook.add_note(content, tags)
+            print(f"Dodano notatkę {note.id}.")
+        elif choice == "2":
+            notebook.show_notes()
+        elif choice == "3":
+            query = ui.get_user_input("Szukane słowa: ")
+            ui.display_contacts(notebook.search_notes(query))
+        elif choice == "4":
+            note_id = int(ui.get_user_input("Id notatki: "))
+            Tag(notebook).add_tag(note_id, ui.get_user_input("Tag: "))
+            print("Dodano tag.")
+        elif choice == "5":
+            ui.display_contacts(Tag(notebook).search_tag(ui.get_user_input("Tag: ")))
+        elif choice == "6":
+            for tag, notes in Tag(notebook).sort_tags().items():
+                print(f"#{tag}: {len(notes)}")
+                ui.display_contacts(notes)
+        elif choice == "7":
+            note_id = int(ui.get_user_input("Id notatki: "))
+            if notebook.delete_note(note_id):
+                print(f"Usunięto notatkę {note_id}.")
+            else:
+                print(f"Notatka {note_id} nie istnieje.")
+    except ValueError as e:
+        print(f"Błąd: {e}")
+
+
+CONTACT_FIELDS = (
+    "name", "phones", "emails", "birthday",
+    "street", "city", "postal_code", "country", "notes",
+)
+LIST_FIELDS = ("phones", "emails", "notes")
+
+
+def contact_format(filename):
+    """Returns the contact file format ("csv", "jsonl" or "vcard") by extension."""
+    extension = os.path.splitext(filename)[1].lower()
+    formats = {".csv": "csv", ".jsonl": "jsonl", ".vcf": "vcard", ".vcard": "vcard"}
+    if extension not in formats:
+        raise ValueError(f"Nieobsługiwany format pliku: {filename}")
+    return formats[extension]
+
+
+def contact_value(value):
+    """Returns a field value as text; numbers are written out, other types are
+    kept as they are for contact_to_record to reject."""
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value.strip() if isinstance(value, str) else value
+
+
+LIST_ITEM_PATTERN = re.compile(r"(?:\\.|\\$|[^;\\])+")
+LIST_ESCAPE_PATTERN = re.compile(r"\\([\\;])")
+
+
+def join_list_field(items):
+    """Joins list items with ';', escaping ';' and '\\' inside the items."""
+    return ";".join(item.replace("\\", "\\\\").replace(";", "\\;") for item in items)
+
+
+def split_list_field(text):
+    """Splits a ';'-separated list written by join_list_field.
+
+    Only '\\;' and '\\\\' are unescaped, so other backslashes (e.g. in paths)
+    of hand-written files are kept as they are.
+    """
+    if "\\" not in text:
+        items = text.split(";")
+    else:
+        items = [
+            LIST_ESCAPE_PATTERN.sub(r"\1", item) for item in LIST_ITEM_PATTERN.findall(text)
+        ]
+    return [item.strip() for item in items if item.strip()]
+
+
+def normalize_contact(row):
+    """Returns a contact dict with all fields; list fields may be ';'-separated."""
+    contact = {}
+    for field in CONTACT_FIELDS:
+        value = row.get(field)
+        if field in LIST_FIELDS:
+            if isinstance(value, str):
+                value = split_list_field(value)
+            elif not isinstance(value, list):
+                value = [] if value is None else [value]
+            contact[field] = [contact_value(item) for item in value]
+        else:
+            contact[field] = contact_value(value)
+    return contact
+
+
+def read_csv_contacts(file):
+    """Yields (line number, contact) pairs from a CSV file with a header row."""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, normalize_contact(row)
+
+
+def read_jsonl_contacts(file):
+    """Yields (line number, contact) pairs from a file with one JSON object per line.
+
+    A line that is not a JSON object is yielded as its text, to be rejected.
+    """
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if isinstance(row, dict):
+            yield line_number, normalize_contact(row)
+        else:
+            yield line_number, line.rstrip("\n")
+
+
+def unfold_vcard_lines(file):
+    """Yields (line number, logical line) pairs, joining folded vCard lines."""
+    pending = None
+    start = 0
+    for line_number, line in enumerate(file, start=1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield start, pending
+        pending, start = line, line_number
+    if pending is not None:
+        yield start, pending
+
+
+def split_vcard_value(value):
+    """Splits a structured vCard value on unescaped ';' and unescapes the parts."""
+    parts = [""]
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            parts[-1] += "\n" if escaped in ("n", "N") else escaped
+        elif char == ";":
+            parts.append("")
+        else:
+            parts[-1] += char
+    return parts
+
+
+def read_vcard_contacts(file):
+    """Yields (line number, contact) pairs from a vCard (.vcf) file."""
+    contact = None
+    start = 0
+    for line_number, line in unfold_vcard_lines(file):
+        if ":" not in line:
+            continue
+        prop, value = line.split(":", 1)
+        prop = prop.split(";", 1)[0].split(".")[-1].upper()
+        if prop == "BEGIN" and value.upper() == "VCARD":
+            contact = normalize_contact({})
+            start = line_number
+        elif contact is None:
+            continue
+        elif prop == "END":
+            yield start, contact
+            contact = None
+        elif prop == "FN":
+            contact["name"] = split_vcard_value(value)[0].strip()
+        elif prop == "TEL":
+            contact["phones"].append(value.strip())
+        elif prop == "EMAIL":
+            contact["emails"].append(value.strip())
+        elif prop == "BDAY":
+            contact["birthday"] = value.strip()
+        elif prop == "ADR":
+            parts = split_vcard_value(value) + [""] * 7
+            contact["street"], contact["city"] = parts[2], parts[3]
+            contact["postal_code"], contact["country"] = parts[5], parts[6]
+        elif prop == "NOTE":
+            contact["notes"].append(split_vcard_value(value)[0])
+
+
+CONTACT_READERS = {
+    "csv": read_csv_contacts,
+    "jsonl": read_jsonl_contacts,
+    "vcard": read_vcard_contacts,
+}
+
+
+def contact_to_record(contact):
+    """Builds a record from a contact dict; raises ValueError if it is invalid."""
+    if not isinstance(contact, dict):
+        raise ValueError("Niepoprawny wiersz")
+    for field in CONTACT_FIELDS:
+        values = contact[field] if field in LIST_FIELDS else [contact[field]]
+        if not all(isinstance(value, str) for value in values):
+            raise ValueError(f"Niepoprawny typ wartości pola {field}")
+    if not contact["name"]:
+        raise ValueError("Brak imienia i nazwiska")
+    record = Record(Name(contact["name"]))
+    for phone in contact["phones"]:
+        record.add_phone(Phone(phone))
+    for email in contact["emails"]:
+        record.add_email(Email(email))
+    if contact["birthday"]:
+        record.birthday = Birthday(contact["birthday"])
+    address = [contact[field] for field in ("street", "city", "postal_code", "country")]
+    if any(address):
+        record.address = Address(*address)
+    for note in contact["notes"]:
+        record.add_note(note)
+    return record
+
+
+def record_to_contact(record):
+    """Returns a contact dict of a record, the inverse of contact_to_record."""
+    address = record.address
+    return {
+        "name": record.name.value,
+        "phones": [phone.value for phone in record.phones],
+        "emails": [email.value for email in record.emails],
+        "birthday": record.birthday.value if record.birthday else "",
+        "street": address.street if address else "",
+        "city": address.city if address else "",
+        "postal_code": address.postal_code if address else "",
+        "country": address.country if address else "",
+        "notes": [str(note) for note in record.notes],
+    }
+
+
+def import_contacts(book, filename, rejects_filename=None, batch_size=10_000):
+    """Streams contacts from a CSV, JSONL or vCard file into the book.
+
+    Contacts are validated with the Phone, Email and Birthday rules. Invalid
+    ones are written as JSON lines to `rejects_filename` (by default
+    `<filename>.rejects.jsonl`) instead of stopping the import. Valid ones are
+    added in batches, without printing. Returns (imported, rejected, seconds).
+    """
+    reader = CONTACT_READERS[contact_format(filename)]
+    if rejects_filename is None:
+        rejects_filename = filename + ".rejects.jsonl"
+    rejects = None
+    imported = rejected = 0
+    batch = []
+    start = time.perf_counter()
+    try:
+        with open(filename, encoding="utf-8", newline="") as file:
+            for line_number, contact in reader(file):
+                try:
+                    batch.append(contact_to_record(contact))
+                except (ValueError, TypeError, AttributeError) as e:
+                    if rejects is None:
+                        rejects = open(rejects_filename, "w", encoding="utf-8")
+                    reject = {"line": line_number, "error": str(e), "contact": contact}
+                    rejects.write(json.dumps(reject, ensure_ascii=False) + "\n")
+                    rejected += 1
+                    continue
+                if len(batch) >= batch_size:
+                    book.add_records(batch)
+                    imported += len(batch)
+                    batch = []
+            book.add_records(batch)
+            imported += len(batch)
+    finally:
+        if rejects is not None:
+            rejects.close()
+    return imported, rejected, time.perf_counter() - start
+
+
+def escape_vcard_value(value):
+    """Escapes a text for a vCard property value."""
+    for char, escaped in (("\\", "\\\\"), (";", "\\;"), (",", "\\,"), ("\n", "\\n")):
+        value = value.replace(char, escaped)
+    return value
+
+
+def write_vcard_contact(file, contact):
+    """Writes one contact as a vCard 3.0 entry."""
+    name = escape_vcard_value(contact["name"])
+    lines = ["BEGIN:VCARD", "VERSION:3.0", f"FN:{name}", f"N:{name};;;;"]
+    lines += [f"TEL:{phone}" for phone in contact["phones"]]
+    lines += [f"EMAIL:{email}" for email in contact["emails"]]
+    if contact["birthday"]:
+        lines.append(f"BDAY:{contact['birthday']}")
+    address = [contact[field] for field in ("street", "city", "postal_code", "country")]
+    if any(address):
+        street, city, postal_code, country = map(escape_vcard_value, address)
+        lines.append(f"ADR:;;{street};{city};;{postal_code};{country}")
+    lines += [f"NOTE:{escape_vcard_value(note)}" for note in contact["notes"]]
+    lines.append("END:VCARD")
+    file.write("\r\n".join(lines) + "\r\n")
+
+
+def export_contacts(book, filename):
+    """Streams the book to a CSV, JSONL or vCard file, one record at a time.
+
+    Returns (exported, seconds).
+    """
+    contact_type = contact_format(filename)
+    exported = 0
+    start = time.perf_counter()
+    with open(filename, "w", encoding="utf-8", newline="", buffering=1 << 20) as file:
+        if contact_type == "csv":
+            writer = csv.writer(file)
+            writer.writerow(CONTACT_FIELDS)
+        for record in book.stream_records():
+            contact = record_to_contact(record)
+            if contact_type == "csv":
+                writer.writerow(
+                    join_list_field(contact[field]) if field in LIST_FIELDS else contact[field]
+                    for field in CONTACT_FIELDS
+                )
+            elif contact_type == "jsonl":
+                file.write(json.dumps(contact, ensure_ascii=False) + "\n")
+            else:
+                write_vcard_contact(file, contact)
+            exported += 1
+    return exported, time.perf_counter() - start
+
+
+class AddressBookService:
+    """Serves one address book to many clients over line-delimited JSON.
+
+    Every request is one line, {"id": 1, "op": "find", "args": {...}}, and gets
+    one response line, {"id": 1, "ok": true, "result": ...} or
+    {"id": 1, "ok": false, "error": "..."}. Clients may pipeline: requests of a
+    connection are answered in order without waiting for the previous reply.
+    All requests run on the event loop thread, so the book needs no locking;
+    the journal is synced every `sync_interval` seconds in the background.
+    """
+
+    def __init__(self, book, filename="address_book.pkl", sync_interval=1.0):
+        self.book = book
+        self.filename = filename
+        self.sync_interval = sync_interval
+        self.requests = 0
+        self.operations = {
+            "add": self.add,
+            "find": self.find,
+            "delete": self.delete,
+            "birthdays": self.birthdays,
+            "stats": self.stats,
+        }
+
+    def add(self, **contact):
+        """Adds or replaces a contact given by the fields of a contact dict."""
+        record = contact_to_record(normalize_contact(contact))
+        self.book[record.name.value] = record
+        return record.name.value
+
+    def find(self, query, limit=100):
+        """Returns up to `limit` contacts containing the phrase."""
+        records = self.book.find_record(query)[:limit]
+        return [record_to_contact(record) for record in records]
+
+    def delete(self, name):
+        """Deletes a contact; returns whether it existed."""
+        if name not in self.book.data:
+            return False
+        del self.book[name]
+        return True
+
+    def birthdays(self, days=7, limit=100):
+        """Returns up to `limit` contacts with birthdays in the next `days` days."""
+        records = self.book.find_by_birthday_range(int(days))[:limit]
+        return [record_to_contact(record) for record in records]
+
+    def stats(self):
+        """Returns the number of contacts and of requests served."""
+        return {"contacts": len(self.book.data), "requests": self.requests}
+
+    def handle(self, line):
+        """Answers one request line with one response line."""
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            operation = self.operations.get(request.get("op"))
+            if operation is None:
+                raise ValueError(f"Nieznana operacja: {request.get('op')}")
+            result = operation(**request.get("args", {}))
+            response = {"id": request_id, "ok": True, "result": result}
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            response = {"id": request_id, "ok": False, "error": str(e)}
+        return json.dumps(response, ensure_ascii=False).encode() + b"\n"
+
+    async def serve_client(self, reader, writer):
+        """Answers the requests of one connection until it closes."""
+        try:
+            while line := await reader.readline():
+                writer.write(self.handle(line))
+                # Only waits when the client stops reading and the buffer fills.
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except ValueError:
+            # A line longer than the stream limit; the connection cannot recover.
+            response = {"id": None, "ok": False, "error": "Za długie zapytanie"}
+            writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+        finally:
+            writer.close()
+
+    async def sync_periodically(self):
+        """Flushes the journal and forces it to disk off the event loop thread."""
+        journal = self.book.journal
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            if journal.entries >= journal.compact_every:
+                journal.compact(self.book.data)
+            elif journal.file is not None:
+                journal.file.flush()
+                await asyncio.to_thread(os.fsync, journal.file.fileno())
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None, ready=None):
+        """Listens on a TCP port, or on a Unix socket if `path` is given.
+
+        `ready`, if given, is called with the listening server.
+        """
+        if self.book.journal is None or self.book.journal.filename != self.filename:
+            save_address_book(self.book, self.filename)
+        self.book.journal.autoflush = False
+        if path is not None:
+            server = await asyncio.start_unix_server(self.serve_client, path)
+        else:
+            server = await asyncio.start_server(self.serve_client, host, port)
+        if ready is not None:
+            ready(server)
+        syncing = asyncio.create_task(self.sync_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            syncing.cancel()
+            self.book.journal.autoflush = True
+            self.book.journal.sync()
+
+
+def serve(argv, filename="address_book.pkl"):
+    """Runs the service: `serve [host] [port]` or `serve unix:<path>`."""
+    service = AddressBookService(load_address_book(filename), filename)
+    if argv and argv[0].startswith("unix:"):
+        address = {"path": argv[0][len("unix:"):]}
+    else:
+        address = {"host": argv[0] if argv else "127.0.0.1"}
+        address["port"] = int(argv[1]) if len(argv) > 1 else 8765
+    print(f"Nasłuchiwanie na {address}")
+    try:
+        asyncio.run(service.serve(**address))
+    except KeyboardInterrupt:
+        print("Zatrzymano serwer.")
+
+
+RENDER_FORMATS = ("text", "tsv", "jsonl")
+TSV_COLUMNS = ("name", "phones", "emails", "birthday", "days_to_birthday", "address")
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+TSV_SPECIAL = re.compile(r"[\\\t\n\r]")
+
+
+def birthday_countdown(today):
+    """Returns a function of a birth date giving the days to the next birthday.
+
+    Only the month and day matter, so the result is memoized per day of the
+    year: a listing computes at most 366 countdowns.
+    """
+    cache = {}
+
+    def days(birth_date):
+        key = (birth_date.month, birth_date.day)
+        if key not in cache:
+            cache[key] = (next_birthday(birth_date, today) - today).days
+        return cache[key]
+
+    return days
+
+
+def render_line(record, fmt, number, countdown, show_name=False):
+    """Returns one output line of a record, including the newline."""
+    if fmt == "jsonl":
+        return json.dumps(record_to_contact(record), ensure_ascii=False) + "\n"
+    if not isinstance(record, Record):
+        return f"{number}. {record}\n"
+    days = countdown(record.birthday.date) if record.birthday else None
+    if fmt == "tsv":
+        values = (
+            record.name.value,
+            ";".join([phone.value for phone in record.phones]),
+            ";".join([email.value for email in record.emails]),
+            record.birthday.value if record.birthday else "",
+            str(days) if record.birthday else "",
+            record.address.value if record.address else "",
+        )
+        # Escaping is rare; one search over all values decides if it is needed.
+        if TSV_SPECIAL.search("".join(values)):
+            values = [value.translate(TSV_ESCAPES) for value in values]
+        return "\t".join(values) + "\n"
+    text = record.format(days=days)
+    if show_name:
+        return f"{number}. {record.name.value}: {text}\n"
+    return f"{number}. {text}\n"
+
+
+def render_records(
+    records, output, fmt="text", limit=None, start=1, show_name=False, batch_size=4096
+):
+    """Writes records to a text stream lazily, in batches; returns how many.
+
+    The records can be any iterable, e.g. a generator or one page of
+    `AddressBook.pages()`; at most `limit` are taken. Lines are numbered from
+    `start` in text format. Birthday countdowns are computed once per day of
+    the year and lines are joined into one write per `batch_size` records,
+    instead of one print per record. TSV
+    starts with a header of TSV_COLUMNS, JSONL has one contact dict per line.
+    """
+    if fmt not in RENDER_FORMATS:
+        raise ValueError(f"Nieznany format: {fmt}")
+    countdown = birthday_countdown(datetime.now().date())
+    if limit is not None:
+        records = itertools.islice(records, limit)
+    if fmt == "tsv":
+        output.write("\t".join(TSV_COLUMNS) + "\n")
+    lines = []
+    count = 0
+    for count, record in enumerate(records, start=1):
+        lines.append(render_line(record, fmt, start + count - 1, countdown, show_name))
+        if len(lines) >= batch_size:
+            output.write("".join(lines))
+            lines.clear()
+    output.write("".join(lines))
+    output.flush()
+    return count
+
+
+EXIT_OK = 0
+EXIT_NOT_FOUND = 1
+EXIT_USAGE = 2
+EXIT_INVALID = 3
+ADDRESS_FIELDS = ("street", "city", "postal_code", "country")
+
+
+def cli_add(book, args, output):
+    contact = normalize_contact(
+        {
+            "name": args.name,
+            "phones": args.phone,
+            "emails": args.email,
+            "birthday": args.birthday,
+            "notes": args.note,
+            **dict(zip(ADDRESS_FIELDS, args.address or ())),
+        }
+    )
+    record = contact_to_record(contact)
+    book[record.name.value] = record
+    output.write(f"Dodano: {record.name.value}\n")
+    return EXIT_OK
+
+
+def cli_find(book, args, output):
+    # A one-off search reads every record once; building the indexes of a
+    # lazily opened book would read them all and then some.
+    number = normalize_phone(args.term)
+    if book._indexed:
+        records = book.find_by_phone(number) if number else book.find_record(args.term)
+    elif number is not None:
+        records = (
+            record for record in book.stream_records()
+            if any(phone.value == number for phone in record.phones)
+        )
+    else:
+        term = args.term
+        records = (record for record in book.stream_records() if record.matches(term))
+    found = render_records(records, output, args.format, args.limit)
+    return EXIT_OK if found else EXIT_NOT_FOUND
+
+
+def cli_delete(book, args, output):
+    code = EXIT_OK
+    for name in args.names:
+        if name in book.data:
+            del book[name]
+            output.write(f"Usunięto: {name}\n")
+        else:
+            print(f"Wpis o nazwie {name} nie istnieje.", file=sys.stderr)
+            code = EXIT_NOT_FOUND
+    return code
+
+
+def cli_birthdays(book, args, output):
+    today = datetime.now().date()
+    end = today + timedelta(days=args.days)
+    if book._indexed:
+        records = book.find_by_birthday_range(args.days)
+    else:
+        upcoming = []
+        for number, record in enumerate(book.stream_records()):
+            if record.birthday:
+                day = next_birthday(record.birthday.date, today)
+                if day <= end:
+                    upcoming.append((day, number, record))
+        upcoming.sort(key=lambda item: item[:2])
+        records = [record for _, _, record in upcoming]
+    found = render_records(records, output, args.format, args.limit)
+    return EXIT_OK if found else EXIT_NOT_FOUND
+
+
+def cli_import(book, args, output):
+    imported, rejected, seconds = import_contacts(book, args.filename, args.rejects)
+    output.write(
+        f"Zaimportowano {imported} kontaktów "
+        f"({imported / max(seconds, 1e-9):.0f}/s), odrzucono {rejected}.\n"
+    )
+    return EXIT_OK if not rejected else EXIT_INVALID
+
+
+def cli_export(book, args, output):
+    exported, seconds = export_contacts(book, args.filename)
+    rate = exported / max(seconds, 1e-9)
+    output.write(f"Wyeksportowano {exported} kontaktów ({rate:.0f}/s).\n")
+    return EXIT_OK
+
+
+def cli_list(book, args, output):
+    book.show_all_records(args.format, args.limit, output)
+    return EXIT_OK
+
+
+def cli_batch(book, args, output):
+    """Runs one subcommand per line (shell quoting, # comments) on one loaded book."""
+    parser = cli_parser()
+    code = EXIT_OK
+    file = sys.stdin if args.filename == "-" else open(args.filename, encoding="utf-8")
+    with file:
+        for line_number, line in enumerate(file, start=1):
+            words = shlex.split(line, comments=True)
+            if not words:
+                continue
+            try:
+                line_args = parser.parse_args(words)
+                if line_args.run in (cli_batch, None):
+                    raise ValueError("Niedozwolone w trybie wsadowym")
+                line_code = run_cli_command(book, line_args, output)
+            except SystemExit as e:
+                line_code = e.code or EXIT_OK
+            except (OSError, ValueError) as e:
+                print(f"Wiersz {line_number}: {e}", file=sys.stderr)
+                line_code = EXIT_INVALID
+            code = max(code, line_code)
+    return code
+
+
+def run_cli_command(book, args, output):
+    """Runs a parsed subcommand; invalid data gives EXIT_INVALID."""
+    try:
+        return args.run(book, args, output)
+    except BrokenPipeError:
+        # Not a data error: cli() treats a closed reader as success.
+        raise
+    except (OSError, ValueError) as e:
+        print(f"Błąd: {e}", file=sys.stderr)
+        return EXIT_INVALID
+
+
+def cli_parser():
+    """Returns the parser of `assistant <subcommand> ...`."""
+    parser = argparse.ArgumentParser(
+        prog="assistant",
+        description="Osobisty asystent bez menu. Kody wyjścia: 0 - sukces,"
+        " 1 - nic nie znaleziono, 2 - błędne wywołanie, 3 - niepoprawne dane.",
+    )
+    parser.add_argument("--file", default="address_book.pkl", help="plik książki")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def output_options(command):
+        command.add_argument("--format", choices=RENDER_FORMATS, default="text")
+        command.add_argument("--limit", type=int)
+
+    add = commands.add_parser("add", help="dodaje lub zastępuje kontakt")
+    add.add_argument("name")
+    add.add_argument("--phone", action="append", default=[])
+    add.add_argument("--email", action="append", default=[])
+    add.add_argument("--birthday", default="")
+    add.add_argument(
+        "--address", nargs=4, metavar=("STREET", "CITY", "CODE", "COUNTRY")
+    )
+    add.add_argument("--note", action="append", default=[])
+    add.set_defaults(run=cli_add)
+
+    find = commands.add_parser("find", help="szuka frazy lub numeru telefonu")
+    find.add_argument("term")
+    output_options(find)
+    find.set_defaults(run=cli_find)
+
+    delete = commands.add_parser("delete", help="usuwa kontakty")
+    delete.add_argument("names", nargs="+")
+    delete.set_defaults(run=cli_delete)
+
+    birthdays = commands.add_parser("birthdays", help="urodziny w ciągu N dni")
+    birthdays.add_argument("days", type=int)
+    output_options(birthdays)
+    birthdays.set_defaults(run=cli_birthdays)
+
+    import_command = commands.add_parser("import", help="importuje CSV/JSONL/vCard")
+    import_command.add_argument("filename")
+    import_command.add_argument("--rejects")
+    import_command.set_defaults(run=cli_import)
+
+    export = commands.add_parser("export", help="eksportuje CSV/JSONL/vCard")
+    export.add_argument("filename")
+    export.set_defaults(run=cli_export)
+
+    list_command = commands.add_parser("list", help="wypisuje wszystkie kontakty")
+    output_options(list_command)
+    list_command.set_defaults(run=cli_list)
+
+    batch = commands.add_parser("batch", help="wykonuje polecenia z pliku lub stdin")
+    batch.add_argument("filename", nargs="?", default="-")
+    batch.set_defaults(run=cli_batch)
+
+    serve_command = commands.add_parser("serve", help="uruchamia serwer JSON-lines")
+    serve_command.add_argument(
+        "address", nargs="*", help="[host] [port] lub unix:<ścieżka>"
+    )
+    serve_command.set_defaults(run=None)
+    return parser
+
+
+def cli(argv):
+    """Runs `assistant <subcommand> ...` and returns the exit status.
+
+    The book is opened lazily: subcommands read only the records they need,
+    and the journal is synced once at the end instead of after every change.
+    """
+    args = cli_parser().parse_args(argv)
+    if args.command == "serve":
+        serve(args.address, args.file)
+        return EXIT_OK
+    with redirect_stdout(sys.stderr):
+        book = load_address_book(args.file)
+    generation = book.generation
+    if book.journal is not None:
+        book.journal.autoflush = False
+    try:
+        code = run_cli_command(book, args, sys.stdout)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (e.g. `head`) went away; silence the flush at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        code = EXIT_OK
+    finally:
+        if book.generation != generation:
+            with redirect_stdout(sys.stderr):
+                save_address_book(book, args.file)
+        if book.journal is not None:
+            book.journal.close()
+    return code
 
 
 def input_phone():
@@ -404,6 +3143,9 @@ class ConsoleInterface(UserInterface):
         print("7. Wczytaj listę kontaktów")
         print("8. Zakończ")
         print("9. Opcje dodatkowe")
+        print("10. Importuj kontakty (CSV/JSONL/vCard)")
+        print("11. Eksportuj kontakty (CSV/JSONL/vCard)")
+        print("12. Notatki")
 
     def get_user_input(self, prompt):
         return input(prompt)
@@ -411,12 +3153,11 @@ class ConsoleInterface(UserInterface):
     def display_message(self, message):
         print(message)
 
-    def display_contacts(self, contacts):
+    def display_contacts(self, contacts, start=1):
         if not contacts:
             print("Brak pasujących kontaktów.")
         else:
-            for i, contact in enumerate(contacts, start=1):
-                print(f"{i}. {contact}")
+            render_records(contacts, sys.stdout, start=start)
 
     def display_contact_details(self, contact):
         print(contact)
@@ -425,6 +3166,11 @@ class ConsoleInterface(UserInterface):
 def main():
     ui = ConsoleInterface()
     address_book = load_address_book()
+    notebook = Notebook()
+    try:
+        notebook.load_notes()
+    except Exception as e:
+        print(f"Błąd przy ładowaniu notatek: {e}")
 
     while True:
         ui.display_menu()
@@ -440,11 +3186,29 @@ def main():
             address_book.add_record(new_record)
 
         elif choice == "2":
-            address_book.show_all_records()
+            if not address_book.data:
+                print("Brak kontaktów")
+            shown = 0
+            for page in address_book.pages(page_size=20):
+                ui.display_contacts(page, start=shown + 1)
+                shown += len(page)
+                if shown < len(address_book.data) and ui.get_user_input(
+                    "Enter - dalej, q - koniec: "
+                ).strip().lower() == "q":
+                    break
 
         elif choice == "3":
             search_term = ui.get_user_input("Wprowadź frazę do wyszukania: ")
-            found_contacts = address_book.find_record(search_term)
+            if normalize_phone(search_term) is not None:
+                found_contacts = address_book.find_by_phone(search_term)
+            else:
+                found_contacts = address_book.find_record(search_term)
+            if not found_contacts:
+                found_contacts = [
+                    record for _, record in address_book.find_fuzzy(search_term)
+                ]
+                if found_contacts:
+                    print("Brak dokładnych wyników, podobne kontakty:")
             ui.display_contacts(found_contacts)
 
         elif choice == "4":
@@ -458,6 +3222,8 @@ def main():
             save_address_book(address_book)
 
         elif choice == "7":
+            if address_book.journal is not None:
+                address_book.journal.close()
             address_book = load_address_book()
 
         elif choice == "8":
@@ -468,6 +3234,32 @@ def main():
             days = ui.get_user_input("Podaj liczbę dni: ")
             address_book.upcoming_birthdays(days)
 
+        elif choice == "10":
+            filename = ui.get_user_input("Podaj nazwę pliku do importu: ")
+            try:
+                imported, rejected, seconds = import_contacts(address_book, filename)
+            except (OSError, ValueError) as e:
+                print(f"Błąd importu: {e}")
+            else:
+                print(
+                    f"Zaimportowano {imported} kontaktów "
+                    f"({imported / max(seconds, 1e-9):.0f}/s), odrzucono {rejected}."
+                )
+
+        elif choice == "11":
+            filename = ui.get_user_input("Podaj nazwę pliku do eksportu: ")
+            try:
+                exported, seconds = export_contacts(address_book, filename)
+            except (OSError, ValueError) as e:
+                print(f"Błąd eksportu: {e}")
+            else:
+                print(f"Wyeksportowano {exported} kontaktów ({exported / max(seconds, 1e-9):.0f}/s).")
+
+        elif choice == "12":
+            notes_menu(notebook, ui)
+
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli(sys.argv[1:]))
     main()
@@ -1,4 +1,8 @@
 
+import argparse
+import shelve
+import sys
+
 def input_error(func):
     def wrapper(*args, **kwargs):
         try:
@@ -7,54 +11,120 @@ def input_error(func):
             return str(e)
     return wrapper
 
-contacts = {}
-
 @input_error
-def hello_command():
+def hello_command(contacts):
     return "How can I help you?"
 
 @input_error
-def add_command(name, phone):
+def add_command(contacts, name, phone):
     contacts[name] = phone
     return f"Added contact: {name}, {phone}"
 
 @input_error
-def change_command(name, phone):
+def change_command(contacts, name, phone):
     contacts[name] = phone
     return f"Changed phone for contact {name} to {phone}"
 
 @input_error
-def phone_command(name):
+def phone_command(contacts, name):
     return f"Phone for contact {name}: {contacts[name]}"
 
 @input_error
-def show_all_command():
+def show_all_command(contacts):
     return "\n".join([f"{name}: {phone}" for name, phone in contacts.items()])
 
-def main():
+# Command words -> handler.
+COMMANDS = {
+    "hello": hello_command,
+    "add": add_command,
+    "change": change_command,
+    "phone": phone_command,
+    "show all": show_all_command,
+}
+EXIT_COMMANDS = {"good bye", "close", "exit"}
+# First words of the two-word commands, so one-word commands need one lookup.
+TWO_WORD_STARTS = {
+    command.split()[0] for command in [*COMMANDS, *EXIT_COMMANDS] if " " in command
+}
+
+class CommandEngine:
+    """Runs bot commands against a contacts store.
+
+    The store is any mapping of name -> phone: a dict by default, or e.g. a
+    shelve file to keep contacts between sessions.
+    """
+
+    def __init__(self, contacts=None):
+        self.contacts = {} if contacts is None else contacts
+
+    def execute(self, line):
+        """Returns the response to one command line, or None for an exit command."""
+        words = line.lower().split()
+        command = words[0] if words else ""
+        if command in TWO_WORD_STARTS:
+            command = " ".join(words[:2])
+            args = words[2:]
+        else:
+            args = words[1:]
+        if command in EXIT_COMMANDS:
+            return None
+        handler = COMMANDS.get(command)
+        if handler is None:
+            return "Invalid command. Type 'hello' to start."
+        try:
+            return handler(self.contacts, *args)
+        except TypeError:
+            return f"Wrong number of arguments for '{command}'."
+
+    def run_batch(self, lines, output):
+        """Executes commands from an iterable of lines, writing one response each.
+
+        Stops at an exit command; returns the number of commands executed.
+        """
+        count = 0
+        write = output.write
+        for line in lines:
+            if not line.strip():
+                continue
+            response = self.execute(line)
+            count += 1
+            if response is None:
+                write("Good bye!\n")
+                break
+            write(response + "\n")
+        return count
+
+def main(contacts=None):
+    engine = CommandEngine(contacts)
     print("Bot Assistant Console:")
     print("Type 'good bye', 'close', or 'exit' to end.")
     while True:
-        user_input = input("Your command: ").lower()
-
-        if user_input in ["good bye", "close", "exit"]:
+        response = engine.execute(input("Your command: "))
+        if response is None:
             print("Good bye!")
             break
-        elif user_input == "hello":
-            print(hello_command())
-        elif user_input.startswith("add"):
-            _, name, phone = user_input.split()
-            print(add_command(name, phone))
-        elif user_input.startswith("change"):
-            _, name, phone = user_input.split()
-            print(change_command(name, phone))
-        elif user_input.startswith("phone"):
-            _, name = user_input.split()
-            print(phone_command(name))
-        elif user_input == "show all":
-            print(show_all_command())
+        print(response)
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Bot Assistant")
+    parser.add_argument(
+        "script", nargs="?",
+        help="file with one command per line ('-' for stdin); interactive without it",
+    )
+    parser.add_argument("--store", help="shelve file keeping the contacts between runs")
+    args = parser.parse_args(argv)
+    contacts = shelve.open(args.store) if args.store else None
+    try:
+        if args.script is None:
+            main(contacts)
+        elif args.script == "-":
+            CommandEngine(contacts).run_batch(sys.stdin, sys.stdout)
         else:
-            print("Invalid command. Type 'hello' to start.")
+            with open(args.script, encoding="utf-8") as file:
+                CommandEngine(contacts).run_batch(file, sys.stdout)
+    finally:
+        if contacts is not None:
+            contacts.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run()
@@ -1,57 +1,108 @@
+import importlib.util
 import os
-import shutil
+import sys
+import time
 import unicodedata
-    
+
+
+def load_shared(name):
+    """Imports a module shared with clean-folder from its package folder."""
+    package = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'clean_folder.py')
+    path = os.path.join(package, 'Clean_folder', name + '.py')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so that worker processes can find its functions by name.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+CLASSIFIER = load_shared('classifier').Classifier()
+archives = load_shared('archives')
+FileMover = load_shared('mover').FileMover
+
+
 def normalize(text):
     normalized_text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
     normalized_text = ''.join(char if char.isalnum() or char in (' ', '_') else '_' for char in normalized_text)
     return normalized_text
 
-def process_folder(folder_path):
-    for root, dirs, files in os.walk("C:\Users\ASUS\Edyta\Do przejrzenia"):
+def split_extension(file_name):
+    """Splits a name into stem and extension, keeping 'a.tar.gz' and 'a.txt.gz' whole."""
+    stem, extension = os.path.splitext(file_name)
+    if extension.lower() == '.gz':
+        # The inner extension names the content: a tar, or a single compressed file.
+        stem, inner = os.path.splitext(stem)
+        extension = inner + extension
+    return stem, extension
+
+def process_folder(folder_path, mover=None, stats=None):
+    mover = mover or FileMover(folder_path)
+    stats = stats or archives.ExtractionStats()
+    archive_paths = []
+    for root, dirs, files in os.walk(folder_path):
         for dir_name in dirs:
             normalized_dir_name = normalize(dir_name)
             if dir_name != normalized_dir_name:
                 os.rename(os.path.join(root, dir_name), os.path.join(root, normalized_dir_name))
 
+        file_paths = []
         for file_name in files:
-            normalized_file_name = normalize(file_name)
+            # The extension is kept, or every file would lose its category.
+            stem, extension = split_extension(file_name)
+            normalized_file_name = normalize(stem) + extension
             if file_name != normalized_file_name:
                 os.rename(os.path.join(root, file_name), os.path.join(root, normalized_file_name))
+            file_paths.append(os.path.join(root, normalized_file_name))
+
+        categories = {path: category_of(path) for path in file_paths}
+        # Category folders of this directory are created in one pass, before any move.
+        mover.prepare({os.path.join(root, category) for category in categories.values()})
+        for file_path, category in categories.items():
+            if category == 'archives':
+                archive_paths.append(file_path)
+            else:
+                move_file(file_path, category, mover)
+
+    # Archives are extracted together, after the walk, in a process pool.
+    extract_archives(archive_paths, mover, stats)
+    return mover
 
-            process_file(os.path.join(root, normalized_file_name))
-
-def process_file(file_path):
-    _, extension = os.path.splitext(file_path)
-    extension = extension[1:].upper()
-
-    if extension in ('JPEG', 'PNG', 'JPG', 'SVG'):
-        move_file(file_path, 'images')
-    elif extension in ('AVI', 'MP4', 'MOV', 'MKV'):
-        move_file(file_path, 'video')
-    elif extension in ('DOC', 'DOCX', 'TXT', 'PDF', 'XLSX', 'PPTX'):
-        move_file(file_path, 'documents')
-    elif extension in ('MP3', 'OGG', 'WAV', 'AMR'):
-        move_file(file_path, 'audio')
-    elif extension in ('ZIP', 'GZ', 'TAR'):
-        extract_archive(file_path)
-    else:
-        move_file(file_path, 'unknown_extensions')
-
-def move_file(file_path, category):
+def category_of(file_path):
+    return CLASSIFIER.classify(file_path) or 'unknown_extensions'
+
+def move_file(file_path, category, mover):
     category_folder = os.path.join(os.path.dirname(file_path), category)
-    if not os.path.exists(category_folder):
-        os.makedirs(category_folder)
-    
-    shutil.move(file_path, os.path.join(category_folder, os.path.basename(file_path)))
+    mover.move(file_path, os.path.join(category_folder, os.path.basename(file_path)))
+
+def unique_folder(folder, taken):
+    """Returns `folder`, or `folder_N` if it exists or another archive claimed it."""
+    candidate = folder
+    suffix = 1
+    while candidate in taken or os.path.exists(candidate):
+        candidate = f"{folder}_{suffix}"
+        suffix += 1
+    taken.add(candidate)
+    return candidate
 
-def extract_archive(archive_path):
-    archive_folder = os.path.join(os.path.dirname(archive_path), 'archives', os.path.basename(archive_path)[:-4])
-    if not os.path.exists(archive_folder):
-        os.makedirs(archive_folder)
+def extract_archives(archive_paths, mover, stats):
+    taken = set()
+    jobs = []
+    for archive_path in archive_paths:
+        name = archives.archive_stem(os.path.basename(archive_path))
+        folder = os.path.join(os.path.dirname(archive_path), 'archives', normalize(name))
+        jobs.append((archive_path, unique_folder(folder, taken)))
 
-    shutil.unpack_archive(archive_path, archive_folder)
-    shutil.rmtree(archive_path)
+    start = time.perf_counter()
+    results = archives.extract_archives(jobs)
+    stats.add(results, time.perf_counter() - start)
+    for archive_path, archive_folder, _, _, error in results:
+        if error:
+            print(f"Could not extract {archive_path}, keeping it: {error}")
+            continue
+        os.remove(archive_path)
+        # The extracted files are sorted like the rest of the folder.
+        process_folder(archive_folder, mover, stats)
 
 def main():
     import sys
@@ -62,11 +113,14 @@ def main():
 
     folder_path = sys.argv[1]
 
-    if not os.path.exists(f"C:\Users\ASUS\Edyta\Do przejrzenia"):
+    if not os.path.exists(folder_path):
         print("Specified folder does not exist.")
         sys.exit(1)
 
-    process_folder("C:\Users\ASUS\Edyta\Do przejrzenia")
+    stats = archives.ExtractionStats()
+    mover = process_folder(folder_path, stats=stats)
+    print(mover.report())
+    print(stats.report())
 
 if __name__ == "__main__":
     main() 
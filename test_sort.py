@@ -0,0 +1,43 @@
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+import sort
+
+
+class ArchiveNamesTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_tar_gz_extracts_to_folder_named_after_archive(self):
+        data = b'%PDF-1.4'
+        with tarfile.open(os.path.join(self.folder, 't.tar.gz'), 'w:gz') as archive:
+            info = tarfile.TarInfo('doc.pdf')
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+        sort.process_folder(self.folder)
+
+        extracted = os.path.join(self.folder, 'archives', 't')
+        self.assertTrue(os.path.isfile(os.path.join(extracted, 'documents', 'doc.pdf')))
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 't.tar.gz')))
+
+    def test_txt_gz_member_keeps_its_extension(self):
+        with gzip.open(os.path.join(self.folder, 'plain.txt.gz'), 'wb') as file:
+            file.write(b'hello')
+
+        sort.process_folder(self.folder)
+
+        extracted = os.path.join(self.folder, 'archives', 'plain_txt')
+        self.assertTrue(os.path.isfile(os.path.join(extracted, 'documents', 'plain.txt')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,30 +1,133 @@
 # pierwsza część dotycząca wątków
 import os
-import shutil
+import queue
+import sys
+import tempfile
+import threading
+import time
 from threading import Thread
 
+# Pliki wpadają do podfolderów nazwanych od rozszerzenia; pliki bez rozszerzenia
+# trafiają do folderu głównego. Każdy plik jest przenoszony dokładnie raz.
+
+def scan_files(source_folder):
+    # Jeden skaner: os.scandir zwraca typ wpisu bez dodatkowego stat na plik.
+    stack = [source_folder]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    yield entry.path
+
+class DestinationCache:
+    # Foldery docelowe są tworzone raz, a zajęte w nich nazwy trzymane w pamięci,
+    # więc dwa pliki o tej samej nazwie nie nadpisują się nawzajem.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = {}
+
+    def claim(self, folder, name):
+        with self.lock:
+            taken = self.names.get(folder)
+            if taken is None:
+                os.makedirs(folder, exist_ok=True)
+                taken = self.names[folder] = set(os.listdir(folder))
+            stem, extension = os.path.splitext(name)
+            candidate = name
+            number = 1
+            while candidate in taken:
+                candidate = f"{stem}_{number}{extension}"
+                number += 1
+            taken.add(candidate)
+        return os.path.join(folder, candidate)
+
+def move_file(source_path, source_folder, destinations):
+    # Zwraca True, jeśli plik został przeniesiony (False, gdy już jest na miejscu).
+    folder, name = os.path.split(source_path)
+    extension = os.path.splitext(name)[1][1:]
+    destination_folder = source_folder
+    if extension:
+        destination_folder = os.path.join(source_folder, extension)
+    if folder == destination_folder:
+        return False
+    os.rename(source_path, destinations.claim(destination_folder, name))
+    return True
+
 def sort_files_by_extension(source_folder):
-    for root, dirs, files in os.walk(source_folder):
-        for file in files:
-            source_path = os.path.join(root, file)
-            extension = os.path.splitext(file)[1][1:]
-            destination_folder = os.path.join(source_folder, extension)
-            if not os.path.exists(destination_folder):
-                os.makedirs(destination_folder)
-            shutil.move(source_path, destination_folder)
-
-def parallel_sort(source_folder, num_threads):
+    source_folder = os.path.normpath(source_folder)
+    destinations = DestinationCache()
+    moved = 0
+    for source_path in list(scan_files(source_folder)):
+        moved += move_file(source_path, source_folder, destinations)
+    return moved
+
+def move_worker(jobs, source_folder, destinations, moved, slot):
+    while True:
+        source_path = jobs.get()
+        if source_path is None:
+            return
+        try:
+            moved[slot] += move_file(source_path, source_folder, destinations)
+        except OSError as e:
+            print(f"Nie udało się przenieść {source_path}: {e}")
+
+def parallel_sort(source_folder, num_threads, queue_size=10_000):
+    # Skaner w tym wątku wypełnia ograniczoną kolejkę, a wątki robocze ją opróżniają:
+    # każdą ścieżkę odbiera dokładnie jeden wątek. Zwraca liczbę przeniesionych plików.
+    source_folder = os.path.normpath(source_folder)
+    jobs = queue.Queue(maxsize=queue_size)
+    destinations = DestinationCache()
+    moved = [0] * num_threads
     threads = []
-    for _ in range(num_threads):
-        thread = Thread(target=sort_files_by_extension, args=(source_folder,))
+    for slot in range(num_threads):
+        thread = Thread(
+            target=move_worker, args=(jobs, source_folder, destinations, moved, slot)
+        )
         thread.start()
         threads.append(thread)
-    for thread in threads:
-        thread.join()
+    try:
+        for source_path in scan_files(source_folder):
+            jobs.put(source_path)
+    finally:
+        # Znaczniki końca idą zawsze, także gdy skanowanie rzuci wyjątek,
+        # inaczej wątki robocze czekałyby w jobs.get() bez końca.
+        for _ in threads:
+            jobs.put(None)
+        for thread in threads:
+            thread.join()
+    return sum(moved)
+
+def make_synthetic_tree(folder, count, extensions=20, per_folder=1000):
+    # Drzewo testowe: `count` pustych plików po `per_folder` w folderze.
+    for i in range(count):
+        if i % per_folder == 0:
+            group = i // per_folder
+            subfolder = os.path.join(folder, f"d{group // 100}", f"d{group}")
+            os.makedirs(subfolder, exist_ok=True)
+        with open(os.path.join(subfolder, f"plik{i}.ext{i % extensions}"), "wb"):
+            pass
+
+def benchmark_parallel_sort(count, max_threads=8):
+    threads = 1
+    while threads <= max_threads:
+        with tempfile.TemporaryDirectory() as folder:
+            make_synthetic_tree(folder, count)
+            start = time.perf_counter()
+            moved = parallel_sort(folder, threads)
+            seconds = time.perf_counter() - start
+        print(f"{count} plików, {threads} wątków: {moved / seconds:.0f} plików/s")
+        threads *= 2
 
-source_folder = "Bałagan"
-num_threads = 4 
-parallel_sort(source_folder, num_threads)
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["benchmark"]:
+        for count in [int(count) for count in sys.argv[2:]] or [1_000_000]:
+            benchmark_parallel_sort(count)
+        sys.exit()
+    source_folder = "Bałagan"
+    num_threads = 4
+    parallel_sort(source_folder, num_threads)
 
 
 # druga część dotycząca procesów
@@ -47,16 +150,17 @@ def factorize_parallel(numbers):
     return results
 
 
-start_time_sync = time.time()
-numbers = [9999999, 8888888, 7777777, 6666666, 5555555]  
-results_sync = factorize_sync(numbers)
-end_time_sync = time.time()
-print("Synchronous execution time:", end_time_sync - start_time_sync)
-print("Synchronous results:", results_sync)
+if __name__ == "__main__":
+    start_time_sync = time.time()
+    numbers = [9999999, 8888888, 7777777, 6666666, 5555555]  
+    results_sync = factorize_sync(numbers)
+    end_time_sync = time.time()
+    print("Synchronous execution time:", end_time_sync - start_time_sync)
+    print("Synchronous results:", results_sync)
 
 
-start_time_parallel = time.time()
-results_parallel = factorize_parallel(numbers)
-end_time_parallel = time.time()
-print("Parallel execution time:", end_time_parallel - start_time_parallel)
-print("Parallel results:", results_parallel)
\ No newline at end of file
+    start_time_parallel = time.time()
+    results_parallel = factorize_parallel(numbers)
+    end_time_parallel = time.time()
+    print("Parallel execution time:", end_time_parallel - start_time_parallel)
+    print("Parallel results:", results_parallel)
\ No newline at end of file